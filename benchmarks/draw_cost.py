@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Headless per-frame draw-cost benchmarks for the scarfe demos and the Ouchi
+# generators. Each case builds its stimulus against the stand-ins in
+# mock_window.py and then times the work done between two flips, calling the
+# demos' own per-frame functions where they have them, so it can be
+# checked against the frame budget without a display.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from mock_window import MockElementArrayStim, MockImageStim, MockShapeStim, MockWindow  # noqa: E402
+
+
+def measure(step, n_frames=300, warmup=10):
+    """
+    Time a per-frame step function and count what it allocates.
+
+    :param step: Function called as step(frame_i) once per simulated frame.
+    :param n_frames: Number of timed frames.
+    :param warmup: Untimed frames run first to fill caches.
+    :return: Dict of per-frame timing percentiles in microseconds and of
+             allocated bytes per frame and peak traced memory.
+    """
+    for frame_i in range(warmup):
+        step(frame_i)
+
+    times = np.empty(n_frames)
+    clock = time.perf_counter
+    for frame_i in range(n_frames):
+        start = clock()
+        step(warmup + frame_i)
+        times[frame_i] = clock() - start
+
+    # Allocation pass, separate from the timing pass because tracing slows it down
+    n_alloc_frames = min(n_frames, 50)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    allocated = 0
+    for frame_i in range(n_alloc_frames):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step(warmup + n_frames + frame_i)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    times_us = times * 1e6
+    return {
+        'mean_us': float(np.mean(times_us)),
+        'p50_us': float(np.percentile(times_us, 50)),
+        'p95_us': float(np.percentile(times_us, 95)),
+        'p99_us': float(np.percentile(times_us, 99)),
+        'max_us': float(np.max(times_us)),
+        'alloc_bytes_per_frame': allocated / n_alloc_frames,
+        'peak_kb': peak / 1024,
+    }
+
+
+def sfm_sphere_case(n_dots, lifetime=None, viewing_distance=None):
+    from scarfe_demos.dot_field import DotField
+    from scarfe_demos.sfm_sphere import SphereTrajectory, sphere_dot_coords
+
+    radius = 400.0
+    win = MockWindow()
+    trajectory = SphereTrajectory(sphere_dot_coords(n_dots, radius, np.random.default_rng(0)),
+                                  0.3, radius, (4, 8), lifetime=lifetime,
+                                  viewing_distance=viewing_distance, seed=0)
+    dots = DotField(win, n_dots, colors=np.ones((n_dots, 3)), stim_class=MockElementArrayStim)
+
+    def step(frame_i):
+        xys, sizes, visible = trajectory.frame(frame_i)
+        dots.update(xys, sizes, visible)
+        dots.draw()
+        win.flip()
+    return step
+
+
+def single_dot_case(flash_rate=10):
+    from scarfe_demos.frame_scheduler import FrameScheduler
+    from scarfe_demos.single_dot import flash_timeline
+
+    win = MockWindow()
+    dot = MockShapeStim(win, radius=25, fillColor=[1, -1, -1], lineColor=[1, -1, -1], pos=(0, 0))
+    timeline = flash_timeline(win.monitorFramePeriod, flash_rate)
+    scheduler = FrameScheduler(win.monitorFramePeriod, get_time=time.perf_counter, spin_margin=0)
+
+    def step(frame_i):
+        # One flip of the demo's timeline, without waiting for its refresh
+        scheduler.show(win, [dot], timeline.states[frame_i % len(timeline.frames)], -np.inf)
+    return step
+
+
+def accurate_timing_case():
+    from scarfe_demos.accurate_timing_demo import timed_frame
+    from scarfe_demos.frame_timer import FrameTimer
+
+    win = MockWindow()
+    timer = FrameTimer(win.monitorFramePeriod, capacity=10000, get_time=time.perf_counter)
+    colors = ([0.5, 0.5, 0.5], [1, -1, -1], [1, -1, 1], [-1, -1, 1])
+
+    def step(frame_i):
+        timed_frame(win, timer, colors[frame_i % len(colors)])
+    return step
+
+
+def ouchi_generate_case(size):
+    from ouchi_parameterized.ouchi import clear_caches, generate_checker_pattern_with_patch
+
+    win = MockWindow()
+    stim = MockImageStim(win, size=(size, size))
+    orientations = (0, 30, 45, 60, 90)
+
+    def step(frame_i):
+        # Worst case: a new condition every frame, rendered from scratch rather
+        # than from the label-map caches
+        clear_caches()
+        stim.image = generate_checker_pattern_with_patch(
+            num_strips=128, size=size, orientation=orientations[frame_i % len(orientations)],
+            patch_radius=size // 5, patch_orientation=-60)
+        stim.draw()
+        win.flip()
+    return step
+
+
+def ouchi_contrast_case(size):
+    from ouchi_parameterized.ouchi import Patch, apply_colors, color_lut, ouchi_labels
+
+    win = MockWindow()
+    stim = MockImageStim(win, size=(size, size))
+    labels = ouchi_labels(size, 128, 45, [Patch(size // 5, -60)])
+    frame_rgb = np.empty((size, size, 3))
+    contrasts = np.linspace(0.1, 1.0, 10)
+
+    def step(frame_i):
+        c = contrasts[frame_i % len(contrasts)]
+        lut = color_lut([([-c] * 3, [c] * 3), ([-1] * 3, [1] * 3)])
+        stim.image = apply_colors(labels, lut, out=frame_rgb)
+        stim.draw()
+        win.flip()
+    return step
+
+
+def ouchi_animation_case(size, n_frames=120):
+    from ouchi_parameterized.ouchi import Patch, apply_colors, color_lut
+    from ouchi_parameterized.ouchi_animation import animate_ouchi, jitter_offsets
+
+    win = MockWindow()
+    stim = MockImageStim(win, size=(size, size))
+    frames = animate_ouchi(jitter_offsets(n_frames, 3, np.random.default_rng(0)), size=size,
+                           num_strips=128, orientation=45, patches=[Patch(size // 5, -60)])
+    lut = color_lut([([-1] * 3, [1] * 3)] * 2)
+    frame_rgb = np.empty((size, size, 3))
+
+    def step(frame_i):
+        stim.image = apply_colors(frames[frame_i % n_frames], lut, out=frame_rgb)
+        stim.draw()
+        win.flip()
+    return step
+
+
+def all_cases():
+    cases = []
+    for n_dots in (1000, 5000, 20000):
+        cases.append((f'sfm_sphere n_dots={n_dots}', lambda n=n_dots: sfm_sphere_case(n)))
+        cases.append((f'sfm_sphere n_dots={n_dots} lifetime+perspective',
+                      lambda n=n_dots: sfm_sphere_case(n, lifetime=30, viewing_distance=2000.0)))
+    cases.append(('single_dot flash', single_dot_case))
+    cases.append(('accurate_timing frame timer', accurate_timing_case))
+    for size in (256, 512, 1024):
+        cases.append((f'ouchi generate size={size}', lambda s=size: ouchi_generate_case(s)))
+        cases.append((f'ouchi contrast lut size={size}', lambda s=size: ouchi_contrast_case(s)))
+        cases.append((f'ouchi animation size={size}', lambda s=size: ouchi_animation_case(s)))
+    return cases
+
+
+def run(n_frames=300, pattern=None, frame_budget_ms=1000 / 60):
+    """
+    Run every case whose name contains pattern and print a table.
+
+    :param n_frames: Timed frames per case.
+    :param pattern: Substring filter on case names (default: all cases).
+    :param frame_budget_ms: Frame budget used to flag slow cases.
+    :return: Dict of case name to the results from measure().
+    """
+    results = {}
+    print(f"{'case':45s} {'mean':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'alloc/frame':>12s}")
+    for name, make_step in all_cases():
+        if pattern is not None and pattern not in name:
+            continue
+        stats = measure(make_step(), n_frames=n_frames)
+        results[name] = stats
+        flag = '  OVER BUDGET' if stats['p99_us'] > frame_budget_ms * 1000 else ''
+        print(f"{name:45s} {stats['mean_us']:7.0f}us {stats['p50_us']:7.0f}us "
+              f"{stats['p95_us']:7.0f}us {stats['p99_us']:7.0f}us "
+              f"{stats['alloc_bytes_per_frame'] / 1024:9.1f} KB{flag}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Headless per-frame draw-cost benchmarks.')
+    parser.add_argument('-n', '--frames', type=int, default=300, help='timed frames per case')
+    parser.add_argument('-k', '--pattern', default=None, help='only run cases containing this text')
+    parser.add_argument('--json', default=None, help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.frames, args.pattern)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+
+# Import-time benchmark for every module of the package. Each import runs in a
+# fresh interpreter, as an analysis worker would start, and is repeated to take
+# the best time. Modules are flagged when they pull in a display or plotting
+# stack at import, or when they cost more than the budget on top of numpy,
+# which nearly everything here needs anyway.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that should only be imported when a demo or device actually needs them
+HEAVY_MODULES = ('psychopy', 'matplotlib', 'scipy', 'serial')
+
+_CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({name!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def package_modules(root=REPO_ROOT):
+    """
+    :param root: Repository root.
+    :return: Dotted names of every module in the packages under root.
+    """
+    names = []
+    for package in sorted(os.listdir(root)):
+        package_dir = os.path.join(root, package)
+        if not os.path.isfile(os.path.join(package_dir, '__init__.py')):
+            continue
+        names.append(package)
+        names += [f'{package}.{f[:-3]}' for f in sorted(os.listdir(package_dir))
+                  if f.endswith('.py') and f != '__init__.py']
+    return names
+
+
+def time_import(name, repeats=5):
+    """
+    Time importing a module in fresh interpreters.
+
+    :param name: Dotted module name.
+    :param repeats: Number of interpreters to start; the best time is kept.
+    :return: Dict of 'ms' (best import time) and 'heavy' (heavy dependencies
+             loaded by the import), or of 'error' if it failed.
+    """
+    best = None
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, '-c', _CHILD.format(name=name, heavy=HEAVY_MODULES)],
+                              cwd=REPO_ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1]}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or result['ms'] < best['ms']:
+            best = result
+    return best
+
+
+def run(pattern=None, repeats=5, budget_ms=30.0):
+    """
+    Time and print the import of every package module.
+
+    :param pattern: Only time modules whose name contains this text.
+    :param repeats: Interpreters started per module.
+    :param budget_ms: Flag modules taking longer than this on top of numpy.
+    :return: Dict of module name to its time_import result, plus 'numpy' as the baseline.
+    """
+    baseline = time_import('numpy', repeats)
+    results = {'numpy': baseline}
+    print(f"{'module':50s} {'ms':>8s} {'over numpy':>11s}")
+    print(f"{'numpy':50s} {baseline['ms']:8.1f}")
+    for name in package_modules():
+        if pattern and pattern not in name:
+            continue
+        result = time_import(name, repeats)
+        results[name] = result
+        if 'error' in result:
+            print(f"{name:50s} {'failed':>8s}   {result['error']}")
+            continue
+        over = result['ms'] - baseline['ms']
+        flags = [f"imports {', '.join(result['heavy'])}"] if result['heavy'] else []
+        if over > budget_ms:
+            flags.append('over budget')
+        print(f"{name:50s} {result['ms']:8.1f} {over:11.1f}  {'; '.join(flags)}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import time of every package module in a fresh interpreter.')
+    parser.add_argument('-k', '--pattern', default=None, help='only time modules containing this text')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='interpreters started per module')
+    parser.add_argument('--budget', type=float, default=30.0, help='ms allowed on top of numpy')
+    parser.add_argument('--json', default=None, help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.pattern, args.repeats, args.budget)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+
+# Stand-ins for the PsychoPy objects the demos draw with, so stimulus-update code
+# can be timed on a machine with no display or GPU. Setters copy their values the
+# way PsychoPy's attribute setters do, so buffer traffic is still counted; drawing
+# and flipping cost nothing.
+
+
+class MockWindow:
+    def __init__(self, size=(1920, 1080), ifi=1 / 60, units='pix', color=(0, 0, 0)):
+        self.size = np.array(size)
+        self.monitorFramePeriod = ifi
+        self.units = units
+        self.color = color
+        self.n_flips = 0
+
+    def flip(self, *args, **kwargs):
+        self.n_flips += 1
+        return time.perf_counter()
+
+    def setBlendMode(self, mode):
+        pass
+
+    def setMouseVisible(self, visible):
+        pass
+
+    def close(self):
+        pass
+
+
+class MockElementArrayStim:
+    def __init__(self, win, units=None, nElements=0, xys=None, sizes=None, colors=None,
+                 opacities=None, elementMask=None, elementTex=None):
+        self.win = win
+        self.nElements = nElements
+        self.xys = xys
+        self.sizes = sizes
+        self.colors = colors
+        self.opacities = opacities
+
+    def __setattr__(self, name, value):
+        if name in ('xys', 'sizes', 'colors', 'opacities') and value is not None:
+            value = np.array(value, dtype=float)
+        object.__setattr__(self, name, value)
+
+    def draw(self):
+        pass
+
+
+class MockShapeStim:
+    def __init__(self, win, **kwargs):
+        self.win = win
+        self.__dict__.update(kwargs)
+
+    def draw(self):
+        pass
+
+
+class MockImageStim:
+    def __init__(self, win, image=None, size=None, **kwargs):
+        self.win = win
+        self.size = size
+        self.image = image
+
+    def __setattr__(self, name, value):
+        if name == 'image' and value is not None:
+            value = np.array(value, dtype=np.float32)
+        object.__setattr__(self, name, value)
+
+    def draw(self):
+        pass
@@ -0,0 +1,299 @@
+import datetime
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+# Performance regression suite for the hot paths across the repository. Every
+# case is a factory taking a problem size and returning a callable, timed with
+# timeit-style calibrated loops over several repeats. Results are stored in a
+# local baseline file keyed by machine and commit, and each run is compared
+# with an earlier run on the same machine, so slowdowns show up as changes
+# against that machine's own history rather than against someone else's
+# hardware.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'benchmarks', 'perf_baseline.json')
+
+
+def staircase_case(n_levels):
+    from staircase.staircase import Staircase
+
+    levels = np.arange(n_levels, dtype=float)
+    responses = (np.random.default_rng(0).random(1000) < 0.8).tolist()
+
+    def run():
+        sc = Staircase(levels, 4, 1, 3, 1, np.inf, np.inf, n_levels // 2, False, 'limiting', np.inf)
+        for is_correct in responses:
+            sc.do_resp(is_correct)
+    return run
+
+
+def _filtered_noise_case(length, box):
+    from noise_detect_discrim.notch_noise_demo import make_box_filtered_noise, make_notch_filtered_noise
+
+    filter_noise = make_box_filtered_noise if box else make_notch_filtered_noise
+    center = length // 16
+    notch = (int(center * 0.8), int(center * 1.2))
+    noise = np.random.default_rng(0).normal(0, 1, length)
+    return lambda: filter_noise(noise, center, 2, notch)
+
+
+def notch_noise_case(length):
+    return _filtered_noise_case(length, box=False)
+
+
+def box_noise_case(length):
+    return _filtered_noise_case(length, box=True)
+
+
+def _checker_pattern_case(size, cold):
+    from ouchi_parameterized.ouchi import clear_caches, generate_checker_pattern_with_patch
+
+    def run():
+        # Cold: render the label maps and masks again; warm: composite cached ones
+        if cold:
+            clear_caches()
+        generate_checker_pattern_with_patch(size=size, patch_radius=size // 5)
+    return run
+
+
+def checker_pattern_cold_case(size):
+    return _checker_pattern_case(size, cold=True)
+
+
+def checker_pattern_warm_case(size):
+    return _checker_pattern_case(size, cold=False)
+
+
+def sfm_frame_case(n_dots):
+    from scarfe_demos.sfm_sphere import SphereTrajectory, sphere_dot_coords
+
+    radius = 400.0
+    trajectory = SphereTrajectory(sphere_dot_coords(n_dots, radius, np.random.default_rng(0)), 0.3, radius,
+                                  (4, 8), lifetime=30, seed=0)
+    frame_i = [0]
+
+    def run():
+        trajectory.frame(frame_i[0])
+        frame_i[0] += 1
+    return run
+
+
+def motion_energy_case(shape):
+    from motion_energy_model.motion_energy_model import filter_responses
+
+    stim = (np.random.default_rng(0).random(shape) < 0.5).astype(float)
+    return lambda: filter_responses(stim)
+
+
+def motion_energy_full_2d_case(shape):
+    from motion_energy_model.motion_energy_model import convolve_filters, oriented_filters
+
+    stim = (np.random.default_rng(0).random(shape) < 0.5).astype(float)
+    filters = list(oriented_filters().values())
+    return lambda: [convolve_filters(stim, filt) for filt in filters]
+
+
+# Case name, factory and problem sizes
+CASES = (
+    ('staircase.do_resp x1000', staircase_case, (10, 1000)),
+    ('notch_filtered_noise', notch_noise_case, (512, 4096, 65536)),
+    ('box_filtered_noise', box_noise_case, (512, 4096, 65536)),
+    ('generate_checker_pattern_with_patch cold', checker_pattern_cold_case, (256, 512, 1024)),
+    ('generate_checker_pattern_with_patch warm', checker_pattern_warm_case, (256, 512, 1024)),
+    ('sfm_sphere.frame', sfm_frame_case, (1000, 10000)),
+    ('motion_energy.filter_responses', motion_energy_case, ((201, 161), (402, 322))),
+    ('motion_energy.convolve_filters', motion_energy_full_2d_case, ((201, 161),)),
+)
+
+
+def case_ids(pattern=None):
+    """
+    :param pattern: Only return cases whose id contains this text.
+    :return: List of (case_id, factory, size), e.g. 'sfm_sphere.frame[1000]'.
+    """
+    ids = []
+    for name, factory, sizes in CASES:
+        for size in sizes:
+            size_label = 'x'.join(str(s) for s in size) if isinstance(size, tuple) else str(size)
+            case_id = f'{name}[{size_label}]'
+            if pattern is None or pattern in case_id:
+                ids.append((case_id, factory, size))
+    return ids
+
+
+def time_callable(fn, repeats=7, min_time=0.05):
+    """
+    Time a callable like timeit: loops per repeat are doubled until a repeat
+    takes at least min_time.
+
+    :param fn: Callable without arguments.
+    :param repeats: Number of timed repeats.
+    :param min_time: Shortest duration of one repeat, s.
+    :return: Dict of the median and minimum time per call in microseconds, the
+             loops per repeat and the number of repeats.
+    """
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    samples = np.array(samples) * 1e6
+    return {'median_us': float(np.median(samples)), 'min_us': float(samples.min()),
+            'loops': loops, 'repeats': repeats}
+
+
+def machine_info():
+    """
+    :return: (machine_id, info): a stable key for this machine and software
+             stack, and the details it is derived from.
+    """
+    cpu = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpu = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), cpu)
+    except OSError:
+        pass
+    info = {'node': platform.node(), 'system': platform.system(), 'machine': platform.machine(), 'cpu': cpu,
+            'cpu_count': os.cpu_count(), 'python': platform.python_version(), 'numpy': np.__version__}
+    digest = hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{info['node']}-{digest}", info
+
+
+def current_commit():
+    """
+    :return: Short hash of HEAD, with '+dirty' if tracked files are modified, or
+             'unknown' outside a git checkout.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('+dirty' if status else '')
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(path, baselines):
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(baselines, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def compare(results, reference, threshold=0.1):
+    """
+    :param results: Dict of case id to time_callable result.
+    :param reference: Earlier results of the same form.
+    :param threshold: Fractional slowdown of the median to flag, e.g. 0.1 for 10%.
+    :return: Dict of case id to (ratio of current to reference median, is_regression),
+             for the cases present in both.
+    """
+    changes = {}
+    for case_id, result in results.items():
+        if case_id in reference:
+            ratio = result['median_us'] / reference[case_id]['median_us']
+            changes[case_id] = (ratio, ratio > 1 + threshold)
+    return changes
+
+
+def run(pattern=None, repeats=7, min_time=0.05, threshold=0.1, baseline_path=DEFAULT_BASELINE,
+        against=None, save=True):
+    """
+    Run the suite, compare with an earlier run on this machine and record the results.
+
+    :param pattern: Only run cases whose id contains this text.
+    :param repeats, min_time: As for time_callable.
+    :param threshold: As for compare.
+    :param baseline_path: JSON file of earlier runs.
+    :param against: Commit to compare with (default: the latest recorded run on
+                    this machine from another commit, or the earlier run of this
+                    commit if there is no other).
+    :param save: Record this run in the baseline file under the current commit.
+    :return: (results, changes): as for compare, changes being empty without a reference.
+    """
+    machine_id, info = machine_info()
+    commit = current_commit()
+    baselines = load_baselines(baseline_path)
+    runs = baselines.get(machine_id, {}).get('runs', {})
+    if against is None:
+        # Latest run of another commit, else an earlier run of this one
+        earlier = sorted((r['recorded'], c) for c, r in runs.items() if c != commit)
+        against = earlier[-1][1] if earlier else (commit if commit in runs else None)
+    elif against not in runs:
+        raise ValueError(f"No run of commit {against} recorded for machine {machine_id}.")
+    reference = runs[against]['results'] if against is not None else {}
+
+    print(f"machine {machine_id}, commit {commit}, comparing with {against or 'nothing'}")
+    print(f"{'case':55s} {'median':>11s} {'min':>11s} {'reference':>11s} {'change':>8s}")
+    results = {}
+    for case_id, factory, size in case_ids(pattern):
+        results[case_id] = time_callable(factory(size), repeats, min_time)
+        line = f"{case_id:55s} {results[case_id]['median_us']:9.1f}us {results[case_id]['min_us']:9.1f}us"
+        if case_id in reference:
+            ratio = results[case_id]['median_us'] / reference[case_id]['median_us']
+            line += f" {reference[case_id]['median_us']:9.1f}us {(ratio - 1) * 100:+7.1f}%"
+            if ratio > 1 + threshold:
+                line += '  SLOWER'
+        print(line, flush=True)
+    changes = compare(results, reference, threshold)
+
+    if save:
+        entry = baselines.setdefault(machine_id, {'machine': info, 'runs': {}})
+        recorded = entry['runs'].setdefault(commit, {'results': {}})
+        recorded['recorded'] = datetime.datetime.now().isoformat(timespec='seconds')
+        recorded['results'].update(results)
+        save_baselines(baseline_path, baselines)
+    return results, changes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Performance regression suite with per-machine baselines.')
+    parser.add_argument('-k', '--pattern', default=None, help='only run cases containing this text')
+    parser.add_argument('-r', '--repeats', type=int, default=7, help='timed repeats per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='shortest repeat, s')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown to flag, as a fraction')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file of earlier runs')
+    parser.add_argument('--against', default=None, help='commit to compare with')
+    parser.add_argument('--no-save', action='store_true', help='do not record this run')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for case_id, _, _ in case_ids(args.pattern):
+            print(case_id)
+        sys.exit(0)
+    _, changes = run(args.pattern, args.repeats, args.min_time, args.threshold, args.baseline,
+                     args.against, not args.no_save)
+    regressions = [case_id for case_id, (_, slower) in changes.items() if slower]
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the reference by more than {args.threshold:.0%}")
+        sys.exit(1)
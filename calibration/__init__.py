@@ -0,0 +1,4 @@
+# Display calibration: gamma fits and linearization (gamma), bit-stealing
+# luminance tables (bit_stealing), calibration data files (read_data), spectral
+# colorimetry (colorimetry) and the PR-655 spectroradiometer (pr655). Import the
+# submodule you need; nothing is imported here so workers start quickly.
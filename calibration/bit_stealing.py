@@ -0,0 +1,160 @@
+import numpy as np
+if __package__:
+    from .read_data import read_data
+else:
+    from read_data import read_data
+
+# Bit-stealing luminance lookup. A table of measured (or predicted) luminances of
+# RGB triplets whose guns differ by at most one step, like the one in sample.ddf,
+# holds several times more distinct grey levels than a single 8-bit gun. The
+# table is sorted by luminance once, and the midpoints between neighbouring
+# luminances are indexed by a uniform bucket grid, so finding the nearest entry
+# for every pixel of an image costs a couple of array passes rather than a
+# binary search per pixel.
+
+
+class BitStealingTable:
+    def __init__(self, table, max_buckets=2**20, max_steps=2):
+        """
+        :param table: (n x 4) array of r, g, b (0 to 255) and luminance rows, in any order.
+        :param max_buckets: Largest bucket grid to build for the index.
+        :param max_steps: Target number of table entries per bucket; the grid is
+                          refined until it is reached or max_buckets is hit.
+        """
+        table = np.asarray(table, dtype=float)
+        order = np.argsort(table[:, 3], kind='stable')
+        self.lum = table[order, 3]
+        self.rgb = table[order, :3].astype(np.uint8)
+        self.n_entries = len(self.lum)
+        self.lum_min, self.lum_max = self.lum[0], self.lum[-1]
+
+        # Entry i is the nearest for luminances between edges[i - 1] and edges[i]
+        self._edges = (self.lum[1:] + self.lum[:-1]) / 2
+        self._padded_edges = np.append(self._edges, np.inf)
+        self._build_index(max_buckets, max_steps)
+        self._colors = {'rgb255': self.rgb, 'rgb': (self.rgb / 127.5 - 1).astype(np.float32)}
+        self._bucket = None
+        self._index = None
+
+    def _build_index(self, max_buckets, max_steps):
+        self._lo = self._edges[0] if len(self._edges) else 0.0
+        span = self._edges[-1] - self._lo if len(self._edges) else 0.0
+        n_buckets = 1024
+        while True:
+            self._scale = n_buckets / span if span > 0 else 0.0
+            starts = self._lo + np.arange(n_buckets + 1) / self._scale if span > 0 else np.zeros(1)
+            first = np.searchsorted(self._edges, starts, side='left')
+            steps = int(np.diff(first).max(initial=0))
+            if steps <= max_steps or n_buckets >= max_buckets:
+                break
+            n_buckets *= 2
+        self.n_buckets = n_buckets if span > 0 else 0
+        self._first = first.astype(np.intp)
+        self._steps = steps
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        :param path: .ddf file of r, g, b, luminance rows, with the column numbers
+                     given by its r, g, b and lum variables.
+        :return: BitStealingTable of its rows.
+        """
+        ddf = read_data(path)
+        return cls(np.column_stack([ddf.column(name) for name in ('r', 'g', 'b', 'lum')]), **kwargs)
+
+    def index(self, lums, out=None):
+        """
+        Table entry with the nearest luminance for every value.
+
+        :param lums: Array of luminances (cd/m^2).
+        :param out: Optional intp array of the same shape to fill.
+        :return: intp array of indices into the sorted table.
+        """
+        lums = np.asarray(lums, dtype=float)
+        if out is None:
+            out = np.empty(lums.shape, dtype=np.intp)
+        if self._bucket is None or self._bucket.shape != lums.shape:
+            self._bucket = np.empty(lums.shape)
+
+        # Bucket of each value, then step over the few edges inside that bucket
+        np.subtract(lums, self._lo, out=self._bucket)
+        self._bucket *= self._scale
+        np.clip(self._bucket, 0, self.n_buckets, out=self._bucket)
+        np.copyto(out, self._bucket, casting='unsafe')
+        np.take(self._first, out, out=out, mode='clip')
+        for _ in range(self._steps):
+            out += np.take(self._padded_edges, out, mode='clip') < lums
+        return out
+
+    def lookup(self, lums, out=None, space='rgb255'):
+        """
+        RGB triplet with the nearest luminance for every value.
+
+        :param lums: Array of luminances (cd/m^2).
+        :param out: Optional (lums.shape + (3,)) array to fill.
+        :param space: 'rgb255' for uint8 0 to 255, or 'rgb' for float32 PsychoPy
+                      color space (-1 to 1).
+        :return: Array of shape lums.shape + (3,).
+        """
+        if space not in self._colors:
+            raise ValueError(f"Unknown color space '{space}', expected 'rgb255' or 'rgb'.")
+        lums = np.asarray(lums, dtype=float)
+        if self._index is None or self._index.shape != lums.shape:
+            self._index = np.empty(lums.shape, dtype=np.intp)
+        self.index(lums, out=self._index)
+        return np.take(self._colors[space], self._index, axis=0, out=out, mode='clip')
+
+    def luminance(self, index):
+        """
+        :param index: Indices into the sorted table.
+        :return: The table luminances at those indices.
+        """
+        return self.lum[index]
+
+    def rgb_to_index(self, rgb):
+        """
+        Table entry of RGB triplets, like rgbtol.m: exact matches where they exist,
+        otherwise the entry with the smallest summed absolute gun difference.
+
+        :param rgb: (..., 3) array of 0 to 255 triplets.
+        :return: intp array of indices into the sorted table.
+        """
+        rgb = np.asarray(rgb, dtype=np.int64)
+        shape = rgb.shape[:-1]
+        rgb = rgb.reshape(-1, 3)
+        keys = (self.rgb.astype(np.int64) * [65536, 256, 1]).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        query = (rgb * [65536, 256, 1]).sum(axis=-1)
+        pos = np.clip(np.searchsorted(sorted_keys, query), 0, len(keys) - 1)
+        index = order[pos]
+        missing = sorted_keys[pos] != query
+        if np.any(missing):
+            distance = np.abs(rgb[missing][:, None, :] - self.rgb.astype(np.int64)).sum(axis=-1)
+            index[missing] = np.argmin(distance, axis=1)
+        return index.reshape(shape)
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    data_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    table = BitStealingTable.from_file(os.path.join(data_dir, 'sample.ddf'))
+    print(f"{table.n_entries} levels from {table.lum_min:.4f} to {table.lum_max:.2f} cd/m^2 "
+          f"({np.log2(table.n_entries):.1f} bits), {table.n_buckets} buckets, {table._steps} steps")
+
+    # A 2% contrast noise image around the luminance of the [160, 160, 160] background
+    mean_lum = table.luminance(table.rgb_to_index([160, 160, 160]))
+    lums = mean_lum * (1 + 0.02 * np.random.default_rng(0).standard_normal((512, 512)))
+    rgb = np.empty((512, 512, 3), dtype=np.uint8)
+    table.lookup(lums, out=rgb)
+    start = time.perf_counter()
+    for _ in range(20):
+        table.lookup(lums, out=rgb)
+    print(f"lookup: {(time.perf_counter() - start) / 20 * 1000:.2f} ms per 512x512 frame")
+
+    achieved = table.luminance(table.index(lums))
+    print(f"{len(np.unique(rgb.reshape(-1, 3), axis=0))} distinct triplets, "
+          f"rms luminance error {np.sqrt(np.mean((achieved - lums) ** 2)):.4f} cd/m^2")
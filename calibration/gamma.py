@@ -0,0 +1,233 @@
+import numpy as np
+if __package__:
+    from .read_data import read_data
+else:
+    from read_data import read_data
+
+# Gamma calibration with the Pelli & Zhang (1991) four-parameter function
+#
+#     L(v) = a + (b + kv)^g   if b + kv >= 0
+#            a                otherwise
+#
+# as in pellipower.m and pellifit.m. All guns are fitted together, and
+# linearization goes through a dense inverse lookup table, so correcting a whole
+# frame is one rounding pass and one np.take instead of a power per pixel.
+# Stimuli drawn through a colour table, like the Ouchi label maps, only need
+# their table linearized.
+
+
+def pelli_power(coeffs, values):
+    """
+    The Pelli gamma function.
+
+    :param coeffs: [a, b, k, g], or an (n_guns x 4) array with one row per gun.
+    :param values: Pixel values, (n,) or (n_guns x n).
+    :return: Luminances, with the shape of values broadcast against the gun rows.
+    """
+    coeffs = np.asarray(coeffs, dtype=float)
+    values = np.asarray(values, dtype=float)
+    a, b, k, g = (c[..., None] for c in np.moveaxis(coeffs, -1, 0))
+    u = b + k * values
+    return a + np.where(u >= 0, np.maximum(u, 0) ** g, 0.0)
+
+
+def _residuals_and_jacobian(params, values, lums, sqrt_weights):
+    a, b, k, g = (c[:, None] for c in params.T)
+    u = b + k * values
+    positive = u > 0
+    u_pos = np.where(positive, u, 1.0)
+    power = np.where(positive, u_pos ** g, 0.0)
+    d_power = np.where(positive, g * u_pos ** (g - 1), 0.0)
+
+    residuals = (a + power - lums) * sqrt_weights
+    jacobian = np.stack([np.ones_like(u), d_power, d_power * values, power * np.log(u_pos)], axis=-1)
+    return residuals, jacobian * sqrt_weights[..., None]
+
+
+def pelli_fit(values, lums, init=None, max_iter=1000, tol=1e-12):
+    """
+    Fit the Pelli gamma function to the measurements of one or more guns at once.
+
+    The fit minimizes sum(0.1 * lum * (L(v) - lum)^2), the weighting used by
+    pellifit.m (which divides by 1 / (0.1 * lum)), with Levenberg-Marquardt steps
+    solved for all guns together.
+
+    :param values: (n,) pixel values at which luminance was measured.
+    :param lums: (n,) luminances, or (n_guns x n) with one row per gun.
+    :param init: Starting [a, b, k, g], one row per gun or shared (default
+                 [min(lum), 0.01, 0.01, 2], as in pellifit.m).
+    :param max_iter: Maximum number of iterations.
+    :param tol: Stop once no gun's weighted error improves by more than this fraction.
+    :return: Fitted [a, b, k, g], with an (n_guns x 4) shape if lums was 2-D.
+    """
+    values = np.asarray(values, dtype=float)
+    lums = np.asarray(lums, dtype=float)
+    single = lums.ndim == 1
+    lums = np.atleast_2d(lums)
+    n_guns = len(lums)
+    sqrt_weights = np.sqrt(0.1 * np.maximum(lums, 0))
+
+    if init is None:
+        init = np.column_stack([lums.min(axis=1), np.full(n_guns, 0.01), np.full(n_guns, 0.01), np.full(n_guns, 2.0)])
+    params = np.array(np.broadcast_to(init, (n_guns, 4)), dtype=float)
+    damping = np.full(n_guns, 1e-3)
+
+    residuals, jacobian = _residuals_and_jacobian(params, values, lums, sqrt_weights)
+    cost = np.sum(residuals ** 2, axis=1)
+    for _ in range(max_iter):
+        jtj = np.einsum('gni,gnj->gij', jacobian, jacobian)
+        jtr = np.einsum('gni,gn->gi', jacobian, residuals)
+
+        # Marquardt scaling, plus a small ridge for guns with fewer points than parameters
+        diag = np.einsum('gii->gi', jtj)
+        lhs = jtj + (damping[:, None] * diag + 1e-12 * (1 + diag))[:, :, None] * np.eye(4)
+        step = np.linalg.solve(lhs, -jtr[..., None])[..., 0]
+
+        trial = params + step
+        trial_residuals, trial_jacobian = _residuals_and_jacobian(trial, values, lums, sqrt_weights)
+        trial_cost = np.sum(trial_residuals ** 2, axis=1)
+
+        better = trial_cost < cost
+        improvement = np.where(better, (cost - trial_cost) / np.maximum(cost, np.finfo(float).tiny), 0.0)
+        params[better] = trial[better]
+        residuals[better] = trial_residuals[better]
+        jacobian[better] = trial_jacobian[better]
+        cost = np.where(better, trial_cost, cost)
+        damping = np.where(better, damping * 0.3, damping * 10)
+
+        if np.all((better & (improvement < tol)) | (damping > 1e12)) or np.all(cost == 0):
+            break
+    return params[0] if single else params
+
+
+class GammaCalibration:
+    def __init__(self, coeffs, max_value=255, n_entries=4096):
+        """
+        Display calibration from fitted Pelli gamma functions.
+
+        :param coeffs: [a, b, k, g] for a single channel (e.g. the combined fit in a
+                       .ddf file), or an (n_guns x 4) array with one row per gun.
+        :param max_value: Largest pixel value of the display (255 for 8 bits).
+        :param n_entries: Number of entries of the inverse lookup tables.
+        """
+        self.coeffs = np.atleast_2d(np.asarray(coeffs, dtype=float))
+        self.n_guns = len(self.coeffs)
+        self.max_value = max_value
+        self.n_entries = n_entries
+
+        lum_ends = self.luminance(np.array([0.0, max_value]))
+        self.lum_min, self.lum_max = lum_ends[:, 0], lum_ends[:, 1]
+
+        # Entry i of each gun's table gives the drive value, in PsychoPy color space,
+        # for a luminance a fraction i / (n_entries - 1) of the way from min to max
+        fractions = np.linspace(0, 1, n_entries)
+        targets = self.lum_min[:, None] + fractions * (self.lum_max - self.lum_min)[:, None]
+        self.lut = self.inverse(targets) / max_value * 2 - 1
+
+        self._offsets = np.arange(self.n_guns) * n_entries
+        self._flat_luts = {}
+        self._index = None
+
+    @classmethod
+    def fit(cls, values, lums, max_value=255, n_entries=4096, init=None):
+        """
+        :param values: (n,) pixel values at which luminance was measured.
+        :param lums: (n,) luminances, or (n_guns x n) with one row per gun.
+        :param max_value, n_entries: As for GammaCalibration.
+        :param init: Starting parameters for pelli_fit.
+        :return: GammaCalibration of the fitted functions.
+        """
+        return cls(pelli_fit(values, lums, init), max_value, n_entries)
+
+    @classmethod
+    def from_file(cls, path, per_gun=True, max_value=None, n_entries=4096):
+        """
+        :param path: .ddf file written by dofit.m.
+        :param per_gun: Use its rcoeffs, gcoeffs and bcoeffs fits of pixel value;
+                        otherwise its single coeffs fit of the combined luminance
+                        table, whose "values" are row numbers of that table.
+        :param max_value: As for GammaCalibration (default: 255 per gun, or the
+                          number of table rows for the combined fit).
+        :param n_entries: As for GammaCalibration.
+        :return: GammaCalibration of the stored fits.
+        """
+        ddf = read_data(path)
+        if per_gun:
+            coeffs = [ddf.variables[name] for name in ('rcoeffs', 'gcoeffs', 'bcoeffs')]
+            return cls(coeffs, 255 if max_value is None else max_value, n_entries)
+        return cls(ddf.variables['coeffs'], len(ddf.data) if max_value is None else max_value, n_entries)
+
+    def luminance(self, values):
+        """
+        :param values: Pixel values, (n,) or (n_guns x n).
+        :return: (n_guns x n) predicted luminances.
+        """
+        return pelli_power(self.coeffs, values)
+
+    def inverse(self, lums):
+        """
+        :param lums: Luminances, (n,) or (n_guns x n).
+        :return: (n_guns x n) pixel values (unrounded) producing them, clipped to
+                 the display range.
+        """
+        a, b, k, g = (c[:, None] for c in self.coeffs.T)
+        values = (np.maximum(np.asarray(lums, dtype=float) - a, 0) ** (1 / g) - b) / k
+        return np.clip(values, 0, self.max_value)
+
+    def _flat_lut(self, dtype):
+        if dtype not in self._flat_luts:
+            self._flat_luts[dtype] = self.lut.astype(dtype).ravel()
+        return self._flat_luts[dtype]
+
+    def linearize(self, image, out=None):
+        """
+        Gamma-correct an image so that its values are linear in luminance.
+
+        :param image: Float image in PsychoPy color space, where -1 and 1 are the
+                      lowest and highest luminance and values in between are spaced
+                      linearly in luminance. With per-gun calibrations the last axis
+                      must hold the guns, e.g. (h x w x 3).
+        :param out: Output array (default: image itself, which is overwritten).
+        :return: The corrected drive values in PsychoPy color space.
+        """
+        if self.n_guns > 1 and image.shape[-1] != self.n_guns:
+            raise ValueError(f"Last axis of image must have {self.n_guns} guns, got shape {image.shape}.")
+        if out is None:
+            out = image
+        if self._index is None or self._index.shape != image.shape:
+            self._index = np.empty(image.shape, dtype=np.intp)
+
+        # Nearest table entry, computed in the output buffer and cast once
+        np.add(image, 1.0, out=out)
+        out *= 0.5 * (self.n_entries - 1)
+        np.clip(out, 0, self.n_entries - 1, out=out)
+        np.rint(out, out=out)
+        np.copyto(self._index, out, casting='unsafe')
+        if self.n_guns > 1:
+            self._index += self._offsets
+        return np.take(self._flat_lut(out.dtype), self._index, out=out, mode='clip')
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    # sample.params holds pixel values and the luminance of each gun
+    data_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    params = read_data(os.path.join(data_dir, 'sample.params'))
+    values, lums = params.column('pval'), np.array([params.column(name) for name in ('rval', 'gval', 'bval')])
+
+    start = time.perf_counter()
+    cal = GammaCalibration.fit(values, lums, n_entries=4096)
+    print(f"Fitted 3 guns in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for gun, coeffs in zip('rgb', cal.coeffs):
+        print(f"  {gun}: a={coeffs[0]:.4g} b={coeffs[1]:.4g} k={coeffs[2]:.4g} g={coeffs[3]:.4g}")
+    print("Measured:\n", lums, "\nPredicted:\n", cal.luminance(values).round(3))
+
+    # Linearize a 512 x 512 RGB frame in place
+    frame = np.random.default_rng(0).uniform(-1, 1, (512, 512, 3)).astype(np.float32)
+    cal.linearize(frame.copy())
+    start = time.perf_counter()
+    for _ in range(100):
+        cal.linearize(frame.copy())
+    print(f"linearize: {(time.perf_counter() - start) * 10:.2f} ms per 512x512 RGB frame (incl. copy)")
@@ -0,0 +1,342 @@
+import json
+import time
+import warnings
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+if __package__:
+    from .colorimetry import S_DEFAULT, spd_to_xyz, wavelengths
+else:
+    from colorimetry import S_DEFAULT, spd_to_xyz, wavelengths
+
+# PR-655 spectroradiometer, the Python side of PR655rawspd.m and
+# zPR655measspd.m. A measurement sends 'M5', waits for the reply (seconds,
+# mostly integration time) and parses the quality code and the wavelength,
+# value lines, resampled to S. Quality codes are handled as in the MATLAB code:
+# 0 and 18 are good readings, -1 and 10 are too dark and read as zero, and -8
+# (no sync) switches sync off and measures again.
+#
+# BackgroundMeter owns the device from a single worker thread, so the serial
+# wait and the parsing overlap with whatever the experiment does meanwhile,
+# typically preparing the next patch, and the spectra of a whole run are
+# converted to XYZ in one matrix product at the end. Every raw reply can be
+# recorded, and ReplayPR655 plays a recording back through the same parsing,
+# with or without the original timing, so calibration runs can be repeated and
+# benchmarked without the meter attached.
+
+QUALITY_GOOD = (0, 18)
+QUALITY_LOW_LIGHT = (-1, 10)
+QUALITY_NO_SYNC = -8
+
+# Native sampling of the PR-655 spectrum reply, nm
+NATIVE_WAVELENGTHS = np.arange(380, 781, 4, dtype=float)
+
+
+class MeterError(RuntimeError):
+    pass
+
+
+def parse_spd_response(text, S=S_DEFAULT):
+    """
+    Parse the reply to an 'M5' measurement command.
+
+    :param text: Raw reply: a line starting with the quality code, then one
+                 "wavelength,value" line per sample.
+    :param S: [start, step, n] sampling to resample the spectrum to.
+    :return: (spd, quality): (n,) spectral radiance, zero for low-light readings,
+             and the integer quality code.
+    """
+    lines = [line.strip() for line in text.replace('\r', '\n').split('\n') if line.strip()]
+    if not lines:
+        raise MeterError("Empty reply from radiometer.")
+    quality = int(float(lines[0].split(',')[0]))
+    if quality in QUALITY_LOW_LIGHT:
+        return np.zeros(int(S[2])), quality
+    if quality not in QUALITY_GOOD:
+        return None, quality
+
+    samples = np.array([[float(v) for v in line.split(',')] for line in lines[1:] if line.count(',') == 1])
+    if len(samples) == 0:
+        raise MeterError("Reply holds no spectrum.")
+    spd = np.interp(wavelengths(S), samples[:, 0], samples[:, 1], left=0, right=0)
+    return spd, quality
+
+
+def format_spd_response(spd, wls=NATIVE_WAVELENGTHS, quality=0):
+    """
+    Reply text the PR-655 would send for a spectrum, for simulated recordings.
+
+    :param spd: Spectral radiance at wls.
+    :param wls: Wavelengths of spd.
+    :param quality: Quality code to report.
+    :return: Reply text.
+    """
+    lines = [f"{quality:04d},111,{wls[np.argmax(spd)]:.0f},{np.sum(spd):.4e}"]
+    lines += [f"{wl:.0f},{value:.4e}" for wl, value in zip(wls, spd)]
+    return '\r\n'.join(lines) + '\r\n'
+
+
+class _Meter(ABC):
+    def __init__(self, S=S_DEFAULT, record=None):
+        self.S = tuple(S)
+        self._record = open(record, 'a') if record is not None else None
+
+    @abstractmethod
+    def write(self, command):
+        """
+        Send a command to the meter.
+
+        :param command: Command text without the line ending, e.g. 'SS0'.
+        """
+
+    @abstractmethod
+    def measure_raw(self):
+        """
+        :return: Raw reply text to an 'M5' measurement.
+        """
+
+    def _measure_logged(self):
+        start = time.perf_counter()
+        text = self.measure_raw()
+        if self._record is not None:
+            self._record.write(json.dumps({'duration': time.perf_counter() - start, 'response': text}) + '\n')
+            self._record.flush()
+        return text
+
+    def measure(self):
+        """
+        Measure the spectrum.
+
+        :return: (spd, quality): (n,) spectral radiance in W/sr/m^2/nm sampled at S,
+                 and the meter's quality code.
+        """
+        spd, quality = parse_spd_response(self._measure_logged(), self.S)
+        if quality == QUALITY_NO_SYNC:
+            warnings.warn("Could not sync to source, turning off sync mode and remeasuring")
+            self.write('SS0')
+            spd, quality = parse_spd_response(self._measure_logged(), self.S)
+        if spd is None:
+            raise MeterError(f"Bad return code {quality} from meter")
+        return spd, quality
+
+    def close(self):
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PR655(_Meter):
+    def __init__(self, port, S=S_DEFAULT, sync=True, timeout=30, record=None):
+        """
+        PR-655 on a serial port (needs the pyserial package).
+
+        :param port: Serial port, e.g. 'COM3' or '/dev/ttyACM0'.
+        :param S: [start, step, n] sampling of the returned spectra.
+        :param sync: Try to sync the integration time to the display refresh.
+        :param timeout: Seconds to wait for a measurement.
+        :param record: Optional file to append every measurement reply to, for
+                       replaying with ReplayPR655.
+        """
+        import serial
+        super().__init__(S, record)
+        self.timeout = timeout
+        self._port = serial.Serial(port, baudrate=9600, timeout=0.1)
+        # Remote mode
+        self._port.write(b'PHOTO')
+        self._read(2)
+        if sync:
+            reply = self._command('F')
+            freq = float(reply.split(',')[1]) if reply.count(',') >= 1 else 0.0
+            if freq > 0:
+                self.write('SS1')
+            else:
+                self.write('SS0')
+                warnings.warn("Could not sync to source.")
+        else:
+            self.write('SS0')
+
+    def _read(self, timeout):
+        # Read until the meter goes quiet after replying, like PR655read
+        deadline = time.perf_counter() + timeout
+        chunks = []
+        while time.perf_counter() < deadline:
+            chunk = self._port.read(self._port.in_waiting or 1)
+            if chunk:
+                chunks.append(chunk)
+            elif chunks:
+                break
+        return b''.join(chunks).decode('ascii', 'replace')
+
+    def write(self, command):
+        self._port.reset_input_buffer()
+        self._port.write(command.encode('ascii') + b'\r')
+
+    def _command(self, command):
+        self.write(command)
+        return self._read(self.timeout)
+
+    def measure_raw(self):
+        """
+        :return: Raw reply to an 'M5' measurement, as PR655rawspd.m.
+        """
+        text = self._command('M5')
+        if not text:
+            raise MeterError("Unable to get reading from radiometer")
+        return text
+
+    def close(self):
+        if self._port.is_open:
+            self._port.write(b'Q')
+            self._port.close()
+        super().close()
+
+
+class ReplayPR655(_Meter):
+    def __init__(self, path, S=S_DEFAULT, timing=True, loop=False):
+        """
+        Stand-in meter that replays replies recorded by PR655(record=...).
+
+        :param path: Recording, one JSON object per line with 'response' and 'duration'.
+        :param S: [start, step, n] sampling of the returned spectra.
+        :param timing: Take as long as the original measurements did; False
+                       returns immediately, to time the software alone.
+        :param loop: Start over at the end of the recording instead of failing.
+        """
+        super().__init__(S)
+        with open(path) as f:
+            self._replies = [json.loads(line) for line in f if line.strip()]
+        if not self._replies:
+            raise MeterError(f"No replies recorded in {path}.")
+        self.timing = timing
+        self.loop = loop
+        self.position = 0
+        self.commands = []
+
+    def write(self, command):
+        self.commands.append(command)
+
+    def measure_raw(self):
+        if self.position == len(self._replies):
+            if not self.loop:
+                raise MeterError("Recording exhausted.")
+            self.position = 0
+        reply = self._replies[self.position]
+        self.position += 1
+        if self.timing:
+            time.sleep(reply.get('duration', 0.0))
+        return reply['response']
+
+
+def write_recording(path, responses, durations=0.0):
+    """
+    Write replies in the format read by ReplayPR655.
+
+    :param path: Output file.
+    :param responses: Reply texts, e.g. from format_spd_response.
+    :param durations: Seconds each measurement took, one per reply or shared.
+    """
+    durations = np.broadcast_to(durations, (len(responses),))
+    with open(path, 'w') as f:
+        for text, duration in zip(responses, durations):
+            f.write(json.dumps({'duration': float(duration), 'response': text}) + '\n')
+
+
+class BackgroundMeter:
+    def __init__(self, meter):
+        """
+        Runs a meter's measurements in a worker thread.
+
+        :param meter: PR655 or ReplayPR655; only the worker thread talks to it
+                      once wrapped.
+        """
+        self.meter = meter
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix='meter')
+
+    def submit(self):
+        """
+        Start a measurement.
+
+        :return: Future of (spd, quality), as for PR655.measure.
+        """
+        return self._pool.submit(self.meter.measure)
+
+    def measure_series(self, patches, show, prepare=None):
+        """
+        Measure a series of patches, preparing each next patch while the current
+        one is measured.
+
+        :param patches: Patch specifications, e.g. RGB triplets.
+        :param show: Called in this thread with a prepared patch to put it on
+                     screen (draw and flip).
+        :param prepare: Optional function turning a patch specification into what
+                        show takes (e.g. an image or stimulus).
+        :return: (spds, qualities): (n_patches x n) spectra and the quality codes.
+        """
+        prepare = prepare or (lambda patch: patch)
+        patches = list(patches)
+        spds = np.empty((len(patches), int(self.meter.S[2])))
+        qualities = np.empty(len(patches), dtype=int)
+        prepared = prepare(patches[0]) if patches else None
+        for i in range(len(patches)):
+            show(prepared)
+            pending = self.submit()
+            if i + 1 < len(patches):
+                prepared = prepare(patches[i + 1])
+            spds[i], qualities[i] = pending.result()
+        return spds, qualities
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.meter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    # Simulated recording of a display with Gaussian primaries and a 2.2 gamma,
+    # measured at 32 grey levels, each measurement taking 50 ms
+    def primary(peak, width):
+        return np.exp(-0.5 * ((NATIVE_WAVELENGTHS - peak) / width) ** 2)
+    primaries = 0.004 * np.array([primary(610, 20), primary(545, 30), primary(455, 15)])
+    levels = np.linspace(0, 255, 32).round()
+    responses = [format_spd_response(((level / 255) ** 2.2) * primaries.sum(axis=0)) for level in levels]
+
+    def prepare(level):
+        # Stand-in for building the patch image, e.g. a gamma-corrected texture
+        time.sleep(0.03)
+        return level
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.jsonl')
+        write_recording(path, responses, 0.05)
+
+        start = time.perf_counter()
+        meter = ReplayPR655(path)
+        spds = []
+        for level in levels:
+            prepare(level)
+            spds.append(meter.measure()[0])
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with BackgroundMeter(ReplayPR655(path)) as background:
+            spds_bg, qualities = background.measure_series(levels, show=lambda patch: None, prepare=prepare)
+        background_time = time.perf_counter() - start
+
+    xyz = spd_to_xyz(spds_bg)
+    print(f"32 patches: one after another {serial_time:.2f} s, pipelined {background_time:.2f} s, "
+          f"identical spectra {np.array_equal(spds, spds_bg)}")
+    print("Y (cd/m^2) at 0, 128 and 255:", xyz[[0, 16, 31], 1].round(3))
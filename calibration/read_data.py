@@ -0,0 +1,198 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+import numpy as np
+
+# Reader for the lab's calibration data files (.ddf, .params), the Python side of
+# readdata.m. Lines starting with '%*' hold MATLAB assignments, which are parsed
+# rather than executed; other '%' lines are comments; everything else is a block
+# of whitespace-separated numbers. The parsed file is kept in a sidecar .npz
+# next to it, which is trusted while the file's size and mtime are unchanged and
+# re-validated by content hash when only the mtime has moved.
+
+# Bump when the parser changes so stale sidecars are never reused
+CACHE_VERSION = 1
+
+_ASSIGNMENT = re.compile(r"\s*([A-Za-z_]\w*)\s*=\s*('[^']*'|\[[^\]]*\]|[^;]+?)\s*(?:;|$)")
+
+
+class DataFile(namedtuple('DataFile', ['data', 'variables', 'comments'])):
+    def column(self, name):
+        """
+        :param name: Variable holding a (1-based) column number, e.g. 'lum' or 'rval'.
+        :return: That column of the data.
+        """
+        return self.data[:, int(self.variables[name]) - 1]
+
+
+def _parse_value(text):
+    text = text.strip()
+    if text.startswith("'"):
+        return text[1:-1]
+    if text.startswith('['):
+        rows = [row.replace(',', ' ').split() for row in text[1:-1].split(';')]
+        rows = [[float(v) for v in row] for row in rows if row]
+        return np.array(rows[0] if len(rows) == 1 else rows)
+    value = float(text)
+    return int(value) if value.is_integer() and re.fullmatch(r'[+-]?\d+', text) else value
+
+
+def parse_assignments(text):
+    """
+    Parse MATLAB assignments like "r = 1; g = 2;" or "coeffs = [0.1,2.3];" without
+    evaluating them.
+
+    :param text: One line of assignments.
+    :return: Dict of name to int, float, str or np.ndarray; statements that are not
+             simple assignments of literals are skipped.
+    """
+    variables = {}
+    for match in _ASSIGNMENT.finditer(text):
+        try:
+            variables[match.group(1)] = _parse_value(match.group(2))
+        except ValueError:
+            continue
+    return variables
+
+
+def parse_data_file(text):
+    """
+    :param text: Contents of a .ddf or .params file (any line endings).
+    :return: DataFile(data, variables, comments).
+    """
+    variables, comments, data_lines = {}, [], []
+    for line in text.splitlines():
+        if line.startswith('%'):
+            if line[2:3] == '*':
+                variables.update(parse_assignments(line[3:]))
+            else:
+                comments.append(line[1:].strip())
+        elif line.strip():
+            data_lines.append(line)
+
+    # Bulk-convert the numeric block in one go
+    if data_lines:
+        n_cols = len(data_lines[0].split())
+        data = np.array(' '.join(data_lines).split(), dtype=float).reshape(-1, n_cols)
+    else:
+        data = np.empty((0, 0))
+    return DataFile(data, variables, comments)
+
+
+def _sidecar_path(path, cache_dir):
+    if cache_dir is None:
+        return path + '.npz'
+    return os.path.join(cache_dir, os.path.basename(path) + '.npz')
+
+
+def _to_json(variables):
+    return json.dumps({name: value.tolist() if isinstance(value, np.ndarray) else value
+                       for name, value in variables.items()})
+
+
+def _from_json(text):
+    return {name: np.array(value) if isinstance(value, list) else value
+            for name, value in json.loads(text).items()}
+
+
+def _load_sidecar(sidecar, stat, raw):
+    with np.load(sidecar) as cached:
+        if int(cached['version']) != CACHE_VERSION or int(cached['size']) != stat.st_size:
+            return None
+        if int(cached['mtime_ns']) != stat.st_mtime_ns:
+            # Touched but maybe not changed: fall back to comparing content hashes
+            if raw is None or str(cached['sha256']) != hashlib.sha256(raw).hexdigest():
+                return None
+        return DataFile(cached['data'], _from_json(str(cached['variables'])),
+                        json.loads(str(cached['comments'])))
+
+
+def _write_sidecar(sidecar, stat, raw, parsed):
+    tmp_path = sidecar + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, data=parsed.data, variables=_to_json(parsed.variables),
+                 comments=json.dumps(parsed.comments), version=CACHE_VERSION,
+                 size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                 sha256=hashlib.sha256(raw).hexdigest())
+    os.replace(tmp_path, sidecar)
+
+
+def read_data(path, cache=True, cache_dir=None):
+    """
+    Read a calibration data file, through its .npz sidecar cache when valid.
+
+    :param path: .ddf or .params file.
+    :param cache: Use and refresh the sidecar cache.
+    :param cache_dir: Directory for the sidecar (default: next to the file).
+    :return: DataFile(data, variables, comments).
+    """
+    path = os.fspath(path)
+    stat = os.stat(path)
+    sidecar = _sidecar_path(path, cache_dir)
+    if cache and os.path.exists(sidecar):
+        try:
+            cached = _load_sidecar(sidecar, stat, None)
+            if cached is not None:
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if cache and os.path.exists(sidecar):
+        # Same size, different mtime: a content hash match still counts
+        try:
+            cached = _load_sidecar(sidecar, stat, raw)
+            if cached is not None:
+                _write_sidecar(sidecar, stat, raw, cached)
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+
+    parsed = parse_data_file(raw.decode('latin-1'))
+    if cache:
+        try:
+            _write_sidecar(sidecar, stat, raw, parsed)
+        except OSError:
+            pass
+    return parsed
+
+
+def read_many(paths, processes=None, cache=True, cache_dir=None):
+    """
+    Read several data files in parallel worker processes.
+
+    :param paths: Files to read, or a glob pattern such as 'logs/*.ddf'.
+    :param processes: Number of worker processes (default: one per CPU; 0 reads in
+                      this process).
+    :param cache, cache_dir: As for read_data.
+    :return: Dict of path to DataFile, in the order given (sorted for a pattern).
+    """
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths))
+    paths = list(paths)
+    if processes == 0 or len(paths) < 2:
+        files = [read_data(path, cache, cache_dir) for path in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            files = list(pool.map(read_data, paths, [cache] * len(paths), [cache_dir] * len(paths)))
+    return dict(zip(paths, files))
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    data_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ('parse', 'cached'):
+            start = time.perf_counter()
+            ddf = read_data(os.path.join(data_dir, 'sample.ddf'), cache_dir=cache_dir)
+            print(f"{label}: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(ddf.data.shape, ddf.variables, ddf.comments)
+    print(ddf.column('lum')[:5])
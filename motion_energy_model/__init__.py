@@ -0,0 +1,3 @@
+# Adelson & Bergen motion energy model (motion_energy_model) and its use as a
+# staircase observer (energy_observer). Import the submodule you need; nothing
+# is imported here so workers start quickly.
@@ -0,0 +1,117 @@
+import numpy as np
+if __package__:
+    from .motion_energy_model import motion_energy
+else:
+    from motion_energy_model import motion_energy
+
+# The motion energy model as the observer of a staircase. The model is
+# deterministic: a given stimulus level always gives the same net motion energy,
+# so it is computed once per level (all of a staircase's levels up front, any
+# off-grid level the first time it is asked for) and a simulated trial is just
+# a cache lookup plus a draw of decision noise. Thousands of simulated
+# staircases then cost about as much as the model run on each level once.
+
+
+class EnergyObserver:
+    def __init__(self, levels, make_stimulus, decision_noise, null_stimulus=None, normalize=False,
+                 rng=None, **filter_params):
+        """
+        :param levels: Stimulus levels to precompute, e.g. Staircase.levels.
+        :param make_stimulus: Function of a level returning the (t x x) stimulus,
+                              moving rightward.
+        :param decision_noise: Standard deviation of the Gaussian noise added to
+                               the energy on every trial.
+        :param null_stimulus: Stimulus of the null interval for a 2AFC detection
+                              task, like do_sim in staircase_minimal_example.py;
+                              None for direction discrimination, where a trial
+                              is correct if the noisy energy is rightward.
+        :param normalize: Use the net energy normalized by the total energy
+                          instead of the raw opponent energy.
+        :param rng: np.random.Generator for the decision noise.
+        :param filter_params: Filter parameters, as for make_filters.
+        """
+        self.make_stimulus = make_stimulus
+        self.decision_noise = decision_noise
+        self.normalize = normalize
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.filter_params = filter_params
+        self.responses = {}
+        for level in np.asarray(levels).tolist():
+            self.response(level)
+        self.null_response = None if null_stimulus is None else self._energy(null_stimulus)
+
+    def _energy(self, stim):
+        return motion_energy(stim, self.normalize, **self.filter_params)[0]
+
+    def response(self, level):
+        """
+        :param level: Stimulus level.
+        :return: Deterministic net motion energy of the stimulus at that level.
+        """
+        level = float(level)
+        if level not in self.responses:
+            self.responses[level] = self._energy(self.make_stimulus(level))
+        return self.responses[level]
+
+    def is_correct(self, level):
+        """
+        Simulate one trial.
+
+        :param level: Stimulus level.
+        :return: Whether the model responded correctly.
+        """
+        target = self.response(level) + self.rng.normal(0, self.decision_noise)
+        if self.null_response is None:
+            return target > 0
+        return target > self.null_response + self.rng.normal(0, self.decision_noise)
+
+
+def simulate_staircases(make_staircase, observer, n_runs):
+    """
+    Run staircases to the end with a model observer.
+
+    :param make_staircase: Function returning a new Staircase.
+    :param observer: EnergyObserver (or anything with is_correct(level)).
+    :param n_runs: Number of staircases.
+    :return: (thresholds, staircases): the reversal threshold of each run and
+             the finished Staircase objects.
+    """
+    staircases = []
+    for _ in range(n_runs):
+        sc = make_staircase()
+        while not sc.is_finished:
+            sc.do_resp(observer.is_correct(sc.cur_level))
+        staircases.append(sc)
+    return np.array([sc.cur_reversal_thresh for sc in staircases]), staircases
+
+
+if __name__ == "__main__":
+    import time
+    from staircase.staircase import Staircase
+
+    # Rightward grating, contrast in dB, sampled at 5 ms and 0.05 deg as the filters are
+    t = np.arange(120)[:, None] * 0.005
+    x = np.arange(100)[None, :] * 0.05
+
+    def grating(level):
+        return 10 ** (level / 20) * np.sin(2 * np.pi * (1.1 * x - 4 * t))
+
+    levels = np.arange(-40.0, 1.0, 2.0)
+    start = time.perf_counter()
+    observer = EnergyObserver(levels, grating, decision_noise=1.0, null_stimulus=np.zeros((120, 100)),
+                              rng=np.random.default_rng(0))
+    per_level = (time.perf_counter() - start) / len(levels)
+    # Put the model's threshold near -20 dB
+    observer.decision_noise = observer.response(-20.0)
+
+    def make_staircase():
+        return Staircase(levels, 6, 2, 3, 1, 50, 10, 0.0, False, 'limiting', float('inf'))
+
+    start = time.perf_counter()
+    thresholds, staircases = simulate_staircases(make_staircase, observer, 2000)
+    elapsed = time.perf_counter() - start
+    n_trials = sum(sc.trial_count for sc in staircases)
+    print(f"model: {per_level * 1000:.1f} ms per level, computed for {len(observer.responses)} levels")
+    print(f"2000 staircases ({n_trials} trials after the first reversal) in {elapsed:.2f} s; "
+          f"recomputing the model every trial would take about {n_trials * per_level:.0f} s")
+    print(f"threshold {np.mean(thresholds):.2f} dB, sd across runs {np.std(thresholds):.2f} dB")
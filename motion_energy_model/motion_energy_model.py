@@ -1,114 +1,168 @@
+import os
 import numpy as np
-import scipy.io as sio
-import matplotlib.pyplot as plt
-from scipy.signal import convolve2d
-from scipy.special import factorial
-
-# Load stimulus data
-stimulus_file = 'AB15.mat'
-stim_data = sio.loadmat(stimulus_file)
-stim = stim_data['stim']
-
-# Step 1a: Define the space axis of the filters
-nx = 80
-max_x = 2.0
-dx = (max_x * 2) / nx
-x_filt = np.linspace(-max_x, max_x, nx)
-
-# Spatial filter parameters
-sx = 0.5
-sf = 1.1
-
-# Spatial filter response
-gauss = np.exp(-x_filt**2 / sx**2)
-even_x = np.cos(2 * np.pi * sf * x_filt) * gauss
-odd_x = np.sin(2 * np.pi * sf * x_filt) * gauss
-
-# Step 1b: Define the time axis of the filters
-nt = 100
-max_t = 0.5
-dt = max_t / nt
-t_filt = np.linspace(0, max_t, nt)
-
-# Temporal filter parameters
-k = 100
-slow_n = 9
-fast_n = 6
-beta = 0.9
-
-# Temporal filter response
-slow_t = (k * t_filt)**slow_n * np.exp(-k * t_filt) * (1/factorial(slow_n) - beta * (k * t_filt)**2 / factorial(slow_n + 2))
-fast_t = (k * t_filt)**fast_n * np.exp(-k * t_filt) * (1/factorial(fast_n) - beta * (k * t_filt)**2 / factorial(fast_n + 2))
-
-# Step 1c: Combine space and time to create spatiotemporal filters
-e_slow = np.outer(slow_t, even_x)
-e_fast = np.outer(fast_t, even_x)
-o_slow = np.outer(slow_t, odd_x)
-o_fast = np.outer(fast_t, odd_x)
-
-# Step 2: Create spatiotemporally oriented filters
-left_1 = o_fast + e_slow
-left_2 = -o_slow + e_fast
-right_1 = -o_fast + e_slow
-right_2 = o_slow + e_fast
+from functools import lru_cache
+from math import factorial
+
+# Adelson & Bergen (1985) motion energy model of a space-time (t x x) stimulus.
+# Each of the four oriented filters is a sum of two separable space-time filters
+# (fast or slow temporal impulse response times even or odd spatial Gabor), so
+# the stimulus is convolved once with each of the four separable components,
+# one 1-D convolution per axis, and the oriented responses are sums of those.
+# This gives the same responses as convolving with the full 2-D filters at a
+# fraction of the cost. The filters are built once per set of parameters.
+
+
+@lru_cache(maxsize=8)
+def make_filters(nx=80, max_x=2.0, sx=0.5, sf=1.1, nt=100, max_t=0.5, k=100, slow_n=9, fast_n=6, beta=0.9):
+    """
+    Spatial and temporal components of the motion energy filters.
+
+    :param nx, max_x: Number of samples and extent (deg) of the space axis.
+    :param sx, sf: Spatial Gaussian width (deg) and frequency (c/deg).
+    :param nt, max_t: Number of samples and extent (s) of the time axis.
+    :param k, slow_n, fast_n, beta: Temporal impulse response parameters.
+    :return: Dict of the 1-D components 'even_x', 'odd_x', 'slow_t' and 'fast_t'.
+    """
+    # Step 1a: Define the space axis of the filters
+    x_filt = np.linspace(-max_x, max_x, nx)
+
+    # Spatial filter response
+    gauss = np.exp(-x_filt**2 / sx**2)
+    even_x = np.cos(2 * np.pi * sf * x_filt) * gauss
+    odd_x = np.sin(2 * np.pi * sf * x_filt) * gauss
+
+    # Step 1b: Define the time axis of the filters
+    t_filt = np.linspace(0, max_t, nt)
+
+    # Temporal filter response
+    slow_t = (k * t_filt)**slow_n * np.exp(-k * t_filt) * (1/factorial(slow_n) - beta * (k * t_filt)**2 / factorial(slow_n + 2))
+    fast_t = (k * t_filt)**fast_n * np.exp(-k * t_filt) * (1/factorial(fast_n) - beta * (k * t_filt)**2 / factorial(fast_n + 2))
+
+    components = {'even_x': even_x, 'odd_x': odd_x, 'slow_t': slow_t, 'fast_t': fast_t}
+    for arr in components.values():
+        arr.setflags(write=False)
+    return components
+
+
+def oriented_filters(**params):
+    """
+    :param params: Filter parameters, as for make_filters.
+    :return: Dict of the full 2-D filters 'left_1', 'left_2', 'right_1' and 'right_2'.
+    """
+    c = make_filters(**params)
+    # Step 1c: Combine space and time to create spatiotemporal filters
+    e_slow = np.outer(c['slow_t'], c['even_x'])
+    e_fast = np.outer(c['fast_t'], c['even_x'])
+    o_slow = np.outer(c['slow_t'], c['odd_x'])
+    o_fast = np.outer(c['fast_t'], c['odd_x'])
+
+    # Step 2: Create spatiotemporally oriented filters
+    return {'left_1': o_fast + e_slow, 'left_2': -o_slow + e_fast,
+            'right_1': -o_fast + e_slow, 'right_2': o_slow + e_fast}
+
 
 # Convolve the filters with the stimulus
 def convolve_filters(stim, filt):
+    from scipy.signal import convolve2d
     return convolve2d(stim, filt, mode='valid', boundary='fill', fillvalue=0)
 
-# Perform the convolution
-resp_right_1 = convolve_filters(stim, right_1)
-resp_right_2 = convolve_filters(stim, right_2)
-resp_left_1 = convolve_filters(stim, left_1)
-resp_left_2 = convolve_filters(stim, left_2)
-
-# Step 4: Square the filter output
-resp_right_1 = resp_right_1**2
-resp_right_2 = resp_right_2**2
-resp_left_1 = resp_left_1**2
-resp_left_2 = resp_left_2**2
-
-# Step 5: Normalize the filter output
-energy_right = resp_right_1 + resp_right_2
-energy_left = resp_left_1 + resp_left_2
-total_energy = np.sum(energy_right) + np.sum(energy_left)
-
-RR1 = np.sum(resp_right_1) / total_energy
-RR2 = np.sum(resp_right_2) / total_energy
-LR1 = np.sum(resp_left_1) / total_energy
-LR2 = np.sum(resp_left_2) / total_energy
-
-# Step 6: Sum the paired filters in each direction
-right_Total = RR1 + RR2
-left_Total = LR1 + LR2
-
-# Step 7: Calculate net energy as the R-L difference
-motion_energy = right_Total - left_Total
-
-# Display summary output and graphics
-print('\n\nNet motion energy =', motion_energy, '\n\n')
-
-# Plot the stimulus
-plt.figure(1)
-plt.imshow(stim, cmap='gray')
-plt.axis('off')
-plt.title('Stimulus')
-
-# Plot the output
-energy_opponent = energy_right - energy_left
-xv, yv = energy_left.shape
-xv, yv = energy_left.shape
-energy_flicker = total_energy / (xv * yv)
-motion_contrast = energy_opponent / energy_flicker
-
-# Plot, scaling by max L or R value
-mc_max = np.max(motion_contrast)
-mc_min = np.min(motion_contrast)
-peak = max(abs(mc_max), abs(mc_min))
-
-plt.figure(2)
-plt.imshow(motion_contrast, cmap='gray', vmin=-peak, vmax=peak)
-plt.axis('off')
-plt.title('Normalized Motion Energy')
-
-plt.show()
\ No newline at end of file
+
+def _convolve_separable(stim, filt_t, filt_x):
+    from scipy.signal import convolve2d
+    return convolve2d(convolve2d(stim, filt_x[None, :], mode='valid'), filt_t[:, None], mode='valid')
+
+
+def filter_responses(stim, **params):
+    """
+    Squared outputs of the four oriented filters.
+
+    :param stim: (t x x) stimulus, at least as large as the filters.
+    :param params: Filter parameters, as for make_filters.
+    :return: Dict of 'right_1', 'right_2', 'left_1' and 'left_2' squared responses.
+    """
+    c = make_filters(**params)
+    stim = np.asarray(stim, dtype=float)
+    e_slow = _convolve_separable(stim, c['slow_t'], c['even_x'])
+    e_fast = _convolve_separable(stim, c['fast_t'], c['even_x'])
+    o_slow = _convolve_separable(stim, c['slow_t'], c['odd_x'])
+    o_fast = _convolve_separable(stim, c['fast_t'], c['odd_x'])
+
+    # Step 4: Square the filter output
+    return {'right_1': (e_slow - o_fast)**2, 'right_2': (e_fast + o_slow)**2,
+            'left_1': (e_slow + o_fast)**2, 'left_2': (e_fast - o_slow)**2}
+
+
+def motion_energy(stim, normalize=True, **params):
+    """
+    Net rightward motion energy of a stimulus.
+
+    :param stim: (t x x) stimulus.
+    :param normalize: Divide by the total (right + left) energy, as in the
+                      original analysis; False gives the raw opponent energy,
+                      which grows with stimulus contrast.
+    :param params: Filter parameters, as for make_filters.
+    :return: (motion_energy, energy_right, energy_left): the net energy and the
+             right and left energy maps.
+    """
+    resp = filter_responses(stim, **params)
+
+    # Step 5: Normalize the filter output
+    energy_right = resp['right_1'] + resp['right_2']
+    energy_left = resp['left_1'] + resp['left_2']
+    total_energy = np.sum(energy_right) + np.sum(energy_left) if normalize else 1.0
+
+    # Steps 6 and 7: Sum the paired filters in each direction and take the R-L difference
+    net = (np.sum(energy_right) - np.sum(energy_left)) / total_energy
+    return net, energy_right, energy_left
+
+
+def load_stimulus(name='AB15.mat'):
+    """
+    :param name: Stimulus file shipped with the package, e.g. 'AB15.mat' or 'AB16.mat'.
+    :return: The (t x x) stimulus it holds.
+    """
+    import scipy.io as sio
+    return sio.loadmat(os.path.join(os.path.dirname(os.path.abspath(__file__)), name))['stim']
+
+
+def plot_motion_energy(stim, energy_right, energy_left):
+    """
+    Show the stimulus and its motion contrast (opponent energy over the mean
+    flicker energy), scaled symmetrically about zero.
+
+    :param stim: (t x x) stimulus.
+    :param energy_right, energy_left: Energy maps from motion_energy.
+    """
+    import matplotlib.pyplot as plt
+
+    # Plot the stimulus
+    plt.figure(1)
+    plt.imshow(stim, cmap='gray')
+    plt.axis('off')
+    plt.title('Stimulus')
+
+    # Plot the output
+    total_energy = np.sum(energy_right) + np.sum(energy_left)
+    energy_opponent = energy_right - energy_left
+    xv, yv = energy_left.shape
+    energy_flicker = total_energy / (xv * yv)
+    motion_contrast = energy_opponent / energy_flicker
+
+    # Plot, scaling by max L or R value
+    peak = np.max(np.abs(motion_contrast))
+
+    plt.figure(2)
+    plt.imshow(motion_contrast, cmap='gray', vmin=-peak, vmax=peak)
+    plt.axis('off')
+    plt.title('Normalized Motion Energy')
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    stim = load_stimulus('AB15.mat')
+    motion_energy_net, energy_right, energy_left = motion_energy(stim)
+
+    # Display summary output and graphics
+    print('\n\nNet motion energy =', motion_energy_net, '\n\n')
+    plot_motion_energy(stim, energy_right, energy_left)
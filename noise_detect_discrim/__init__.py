@@ -0,0 +1,4 @@
+# Filtered-noise stimuli (notch_noise_demo) and their analysis: spectral slopes
+# (spectral_slope, local_slope), streaming weighted means (weighted_mean) and
+# classification images (classification_image). Import the submodule you need;
+# nothing is imported here so workers start quickly.
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 def make_notch_filtered_noise(noise, center_freq, octaves, notch):
     """
@@ -120,6 +119,8 @@ def plot_spectrum(noise, title, c_bar = False):
     :param noise: The noise signal.
     :param title: Title for the plot.
     """
+    import matplotlib.pyplot as plt
+
     # Compute the amplitude spectrum
     spectrum = np.abs(np.fft.fftshift(np.fft.fft(noise)))
 
@@ -132,41 +133,65 @@ def plot_spectrum(noise, title, c_bar = False):
     if c_bar:
         plt.colorbar()
 
-# Generate 1D Gaussian white noise
-length = 512  # Length of the noise array
-noise_1d = generate_gaussian_white_noise(length)
+def notch_noise_image(length, center_freq, octaves, notch, box=True, rng=None):
+    """
+    One filtered-noise stimulus as made in the demo below, e.g. as a trial_compiler
+    build function.
+
+    :param length: Width and height of the image in pixels.
+    :param center_freq: Center frequency for the filter.
+    :param octaves: Octave range for the filter.
+    :param notch: Tuple indicating the start and end of the notch.
+    :param box: Keep only the band around the notch (box filter), as the demo does;
+                False removes the notch from the band instead.
+    :param rng: np.random.Generator to draw the white noise from (default: a fresh one).
+    :return: (length x length) image in [0, 1] made of identical rows.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    noise = rng.normal(0, 1, length)
+    filter_noise = make_box_filtered_noise if box else make_notch_filtered_noise
+    filtered = normalize_contrast(filter_noise(noise, center_freq, octaves, notch))
+    return np.tile(filtered, (length, 1))
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # Generate 1D Gaussian white noise
+    length = 512  # Length of the noise array
+    noise_1d = generate_gaussian_white_noise(length)
 
-# Convert to 2D
-noise_2d = np.tile(noise_1d, (length, 1))
+    # Convert to 2D
+    noise_2d = np.tile(noise_1d, (length, 1))
 
-# Apply notch filter
-center_freq =  8 #length // 4
-octaves = 6
-notch = (center_freq // 2, 3 * center_freq // 2)
-filtered_noise_1d = make_box_filtered_noise(noise_1d, center_freq, octaves, notch)
-print(filtered_noise_1d)
+    # Apply notch filter
+    center_freq =  8 #length // 4
+    octaves = 6
+    notch = (center_freq // 2, 3 * center_freq // 2)
+    filtered_noise_1d = make_box_filtered_noise(noise_1d, center_freq, octaves, notch)
+    print(filtered_noise_1d)
 
-filtered_noise_1d = normalize_contrast(filtered_noise_1d)
-filtered_noise_2d = np.tile(filtered_noise_1d, (length, 1))
+    filtered_noise_1d = normalize_contrast(filtered_noise_1d)
+    filtered_noise_2d = np.tile(filtered_noise_1d, (length, 1))
 
-# Plotting
-plt.figure(figsize=(12, 10))
+    # Plotting
+    plt.figure(figsize=(12, 10))
 
-# Original and filtered noise images
-plt.subplot(2, 2, 1)
-plt.imshow(noise_2d, cmap='gray')
-plt.title("Original 2D Gaussian White Noise")
+    # Original and filtered noise images
+    plt.subplot(2, 2, 1)
+    plt.imshow(noise_2d, cmap='gray')
+    plt.title("Original 2D Gaussian White Noise")
 
-plt.subplot(2, 2, 2)
-plt.imshow(filtered_noise_2d, cmap='gray')
-plt.title("Filtered Noise")
+    plt.subplot(2, 2, 2)
+    plt.imshow(filtered_noise_2d, cmap='gray')
+    plt.title("Filtered Noise")
 
-# Amplitude spectra
-plt.subplot(2, 2, 3)
-plot_spectrum(noise_1d, "Amplitude Spectrum of Original Noise")
+    # Amplitude spectra
+    plt.subplot(2, 2, 3)
+    plot_spectrum(noise_1d, "Amplitude Spectrum of Original Noise")
 
-plt.subplot(2, 2, 4)
-plot_spectrum(filtered_noise_1d, "Amplitude Spectrum of Filtered Noise")
+    plt.subplot(2, 2, 4)
+    plot_spectrum(filtered_noise_1d, "Amplitude Spectrum of Filtered Noise")
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,4 @@
+# Ouchi illusion stimuli: label-map rendering (checker_render, ouchi), the
+# condition cache (ouchi_cache) and animations (ouchi_animation). PsychoPy is
+# only imported by the demos, so stimuli can be generated headless. Import the
+# submodule you need; nothing is imported here so workers start quickly.
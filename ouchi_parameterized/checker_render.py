@@ -0,0 +1,176 @@
+import numpy as np
+
+# Analytic renderer for the Ouchi checker pattern. Instead of painting the pattern
+# strip by strip and then rotating the finished image, every output pixel is mapped
+# back into the unrotated pattern and its check is worked out directly. This
+# replaces the nested loops and the interpolating rotate with a few array
+# operations and works for any orientation.
+
+# Label values in the maps returned by checker_labels
+OUTSIDE = 0
+COLOR1 = 1
+COLOR2 = 2
+
+
+def source_pixels(size, orientation=0):
+    """
+    Nearest unrotated-pattern pixel for every pixel of a rotated image.
+
+    Parameters:
+    -----------
+    size : int
+        Size of the square image in pixels.
+    orientation : float
+        Orientation of the pattern in degrees, rotating the same way as
+        scipy.ndimage.rotate(..., axes=(1, 0)) and np.rot90 (default=0).
+
+    Returns:
+    --------
+    src_row, src_col : np.ndarray
+        Two (size x size) integer arrays of source row and column indices.
+        Indices can fall outside [0, size) near the corners.
+    """
+    theta = np.radians(orientation)
+    cos_t = np.round(np.cos(theta), 12)
+    sin_t = np.round(np.sin(theta), 12)
+    centre = (size - 1) / 2
+    offsets = np.arange(size) - centre
+    dr = offsets[:, None]
+    dc = offsets[None, :]
+    src_row = np.floor(dr * cos_t + dc * sin_t + centre + 0.5).astype(np.intp)
+    src_col = np.floor(dc * cos_t - dr * sin_t + centre + 0.5).astype(np.intp)
+    return src_row, src_col
+
+
+def check_size(size, num_strips, cycles_per_strip=16):
+    """
+    Width and height in pixels of one check of the unrotated pattern.
+
+    Returns:
+    --------
+    strip_width, segment_height : int
+    """
+    strip_width = size // num_strips
+    segment_height = size // (cycles_per_strip * 2)
+    if strip_width < 1 or segment_height < 1:
+        raise ValueError(f"Image of size {size} is too small for {num_strips} strips "
+                         f"and {cycles_per_strip} cycles per strip.")
+    return strip_width, segment_height
+
+
+def pattern_extent(size, num_strips, cycles_per_strip=16):
+    """
+    Number of rows and columns of the unrotated image covered by the pattern.
+
+    Returns:
+    --------
+    rows, cols : int
+    """
+    strip_width, segment_height = check_size(size, num_strips, cycles_per_strip)
+    return (min(cycles_per_strip * 2 * segment_height, size),
+            min(num_strips * strip_width, size))
+
+
+def checker_tile(size, num_strips, cycles_per_strip=16):
+    """
+    Smallest periodic tile of the unrotated pattern: two checks by two checks.
+
+    Returns:
+    --------
+    tile : np.ndarray
+        A (2 * segment_height x 2 * strip_width) uint8 array of COLOR1 and COLOR2.
+    """
+    strip_width, segment_height = check_size(size, num_strips, cycles_per_strip)
+    rows = np.arange(2 * segment_height)[:, None] // segment_height
+    cols = np.arange(2 * strip_width)[None, :] // strip_width
+    return np.where((rows + cols) % 2 == 0, COLOR1, COLOR2).astype(np.uint8)
+
+
+def checker_labels(size, num_strips, orientation=0, cycles_per_strip=16):
+    """
+    Label map of a rotated checkerboard-like pattern.
+
+    Parameters:
+    -----------
+    size : int
+        Size of the square label map in pixels.
+    num_strips : int
+        Number of vertical strips the unrotated pattern is divided into.
+    orientation : float
+        Orientation of the pattern in degrees, rotating the same way as
+        scipy.ndimage.rotate(..., axes=(1, 0)) and np.rot90 (default=0).
+    cycles_per_strip : int
+        Number of square-wave cycles down each strip (default=16).
+
+    Returns:
+    --------
+    labels : np.ndarray
+        A (size x size) uint8 array holding COLOR1 or COLOR2 for each check, and
+        OUTSIDE where the rotated pattern does not cover the image.
+    """
+    tile = checker_tile(size, num_strips, cycles_per_strip)
+    extent = pattern_extent(size, num_strips, cycles_per_strip)
+    return tile_labels(tile, extent, size, orientation)
+
+
+def tile_labels(tile, extent, size, orientation=0, margin=0):
+    """
+    Label map of a rotated pattern built by repeating a periodic tile.
+
+    Parameters:
+    -----------
+    tile : np.ndarray
+        Periodic tile of the unrotated pattern, as from checker_tile.
+    extent : tuple of int or None
+        (rows, cols) of the unrotated image covered by the pattern, or None
+        for a pattern that repeats without end.
+    size : int
+        Size of the square label map in pixels.
+    orientation : float
+        Orientation of the pattern in degrees (default=0).
+    margin : int
+        Extra pixels rendered on every side around the same centre, so that
+        shifted crops of up to margin pixels stay inside the map (default=0).
+
+    Returns:
+    --------
+    labels : np.ndarray
+        A (size + 2 * margin) square array of tile values, OUTSIDE where the
+        pattern does not reach.
+    """
+    # Map output pixel centres back into the unrotated pattern and look up the
+    # periodic tile there
+    src_row, src_col = source_pixels(size + 2 * margin, orientation)
+    if margin:
+        src_row -= margin
+        src_col -= margin
+
+    labels = tile[src_row % tile.shape[0], src_col % tile.shape[1]]
+    if extent is not None:
+        inside = ((src_col >= 0) & (src_col < extent[1]) &
+                  (src_row >= 0) & (src_row < extent[0]))
+        labels[~inside] = OUTSIDE
+    return labels
+
+
+def render_checker(size, num_strips, orientation=0, color1=[-1, -1, -1],
+                   color2=[1, 1, 1], cycles_per_strip=16):
+    """
+    Render a rotated checkerboard-like pattern in colour.
+
+    Parameters:
+    -----------
+    size, num_strips, orientation, cycles_per_strip :
+        As for checker_labels.
+    color1 : list of float
+        The "black" color of the pattern (in PsychoPy color space).
+    color2 : list of float
+        The "white" color of the pattern.
+
+    Returns:
+    --------
+    image_arr : np.ndarray
+        A 3D NumPy array (size x size x 3), zero where the pattern does not reach.
+    """
+    lut = np.array([[0, 0, 0], color1, color2], dtype=float)
+    return lut[checker_labels(size, num_strips, orientation, cycles_per_strip)]
@@ -0,0 +1,413 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+if __package__:
+    from .checker_render import OUTSIDE, checker_labels, checker_tile, pattern_extent, tile_labels
+else:
+    from checker_render import OUTSIDE, checker_labels, checker_tile, pattern_extent, tile_labels
+
+# Ouchi illusion stimuli with a circular or square background and any number of
+# circular patches. The geometry is computed once as a compact integer label map:
+# 0 is uncovered, 1/2 are the two checks of the background, 3/4 the two checks of
+# the first patch, 5/6 the second patch, and so on. Colours are applied last
+# through a small lookup table, so changing contrasts never re-renders the pattern.
+
+Patch = namedtuple('Patch', ['radius', 'orientation', 'center'], defaults=[(0, 0)])
+Patch.__doc__ = """
+Circular patch of the Ouchi pattern.
+
+radius : int
+    Radius of the patch in pixels.
+orientation : float
+    Orientation of the checks inside the patch in degrees.
+center : tuple of int
+    (x, y) offset of the patch centre from the image centre in pixels (default=(0, 0)).
+"""
+
+BACKGROUNDS = ('circle', 'square')
+
+
+@lru_cache(maxsize=64)
+def _oriented_labels(size, num_strips, orientation, cycles_per_strip):
+    labels = checker_labels(size, num_strips, orientation, cycles_per_strip)
+    labels.setflags(write=False)
+    return labels
+
+
+@lru_cache(maxsize=64)
+def disc_mask(size, radius, center=(0, 0)):
+    """
+    Read-only boolean disc mask, cached per size, radius and centre.
+
+    Parameters:
+    -----------
+    size : int
+        Size of the square mask in pixels.
+    radius : int
+        Radius of the disc in pixels.
+    center : tuple of int
+        (x, y) offset of the disc centre from the image centre in pixels.
+
+    Returns:
+    --------
+    mask : np.ndarray
+        A (size x size) boolean array, True inside the disc.
+    """
+    yy, xx = np.ogrid[:size, :size]
+    mid = size // 2
+    mask = (xx - mid - center[0])**2 + (yy - mid - center[1])**2 <= radius**2
+    mask.setflags(write=False)
+    return mask
+
+
+def clear_caches():
+    """
+    Drop the cached label maps and disc masks, so the next pattern is rendered
+    from scratch (e.g. to time regeneration rather than cache hits).
+    """
+    _oriented_labels.cache_clear()
+    disc_mask.cache_clear()
+
+
+def ouchi_labels(size=512, num_strips=20, orientation=0, patches=(Patch(100, 90),),
+                 background='circle', cycles_per_strip=16):
+    """
+    Label map of an Ouchi pattern with any number of circular patches.
+
+    Parameters:
+    -----------
+    size : int
+        Size of the resulting square label map in pixels (default=512).
+    num_strips : int
+        Number of strips to divide the image into (default=20).
+    orientation : float
+        Orientation of the background pattern in degrees (default=0).
+    patches : sequence of Patch
+        Patches drawn over the background in order, later ones on top.
+    background : str
+        'circle' to mask the background to the inscribed circle, or 'square'
+        to leave it unmasked (default='circle').
+    cycles_per_strip : int
+        Number of square-wave cycles down each strip (default=16).
+
+    Returns:
+    --------
+    labels : np.ndarray
+        A (size x size) uint8 array; see the module comment for the label values.
+    """
+    if background not in BACKGROUNDS:
+        raise ValueError(f"Unknown background '{background}', expected one of {BACKGROUNDS}.")
+    if 2 * len(patches) + 2 > np.iinfo(np.uint8).max:
+        raise ValueError(f"Too many patches ({len(patches)}) for a uint8 label map.")
+
+    labels = _oriented_labels(size, num_strips, orientation, cycles_per_strip).copy()
+    if background == 'circle':
+        labels[~disc_mask(size, size // 2, (0, 0))] = OUTSIDE
+
+    for patch_i, patch in enumerate(patches, start=1):
+        patch = Patch(*patch)
+        mask = disc_mask(size, patch.radius, tuple(patch.center))
+        patch_labels = _oriented_labels(size, num_strips, patch.orientation, cycles_per_strip)[mask]
+        labels[mask] = np.where(patch_labels == OUTSIDE, OUTSIDE, patch_labels + 2 * patch_i)
+    return labels
+
+
+def color_lut(colors, outside_color=[0, 0, 0]):
+    """
+    Lookup table turning an Ouchi label map into colours.
+
+    Parameters:
+    -----------
+    colors : sequence of (color1, color2) pairs
+        The "black" and "white" colors (in PsychoPy color space) of the
+        background first, then of each patch in the order they were given.
+    outside_color : list of float
+        Color where the pattern does not reach (default=[0, 0, 0]).
+
+    Returns:
+    --------
+    lut : np.ndarray
+        A (2 * len(colors) + 1 x 3) array indexed by label.
+    """
+    rows = [outside_color]
+    for color1, color2 in colors:
+        rows.extend([color1, color2])
+    return np.array(rows, dtype=float)
+
+
+def apply_colors(labels, lut, out=None):
+    """
+    Colour a label map through a lookup table.
+
+    Parameters:
+    -----------
+    labels : np.ndarray
+        Label map from ouchi_labels.
+    lut : np.ndarray
+        Lookup table from color_lut.
+    out : np.ndarray, optional
+        Preallocated (size x size x 3) array to write into, so contrast changes
+        between trials do not allocate a new image.
+
+    Returns:
+    --------
+    image_arr : np.ndarray
+        A 3D NumPy array (size x size x 3) with the pattern.
+    """
+    return np.take(lut, labels, axis=0, out=out)
+
+
+TileLayer = namedtuple('TileLayer', ['orientation', 'mask_bits', 'mask_shape', 'offset'])
+TileLayer.__doc__ = """
+One layer (background or patch) of an OuchiTiles stimulus.
+
+orientation : float
+    Orientation of the checks in this layer in degrees.
+mask_bits : np.ndarray or None
+    Bit-packed uint8 mask of the layer's bounding box, or None if the layer
+    covers the whole image.
+mask_shape : tuple of int
+    (rows, cols) of the unpacked mask.
+offset : tuple of int
+    (row, col) of the mask's top-left corner in the full image.
+"""
+
+
+class OuchiTiles(namedtuple('OuchiTiles', ['tile', 'size', 'extent', 'layers', 'lut'])):
+    """
+    Compact Ouchi stimulus: one periodic tile, per-layer masks and orientations.
+
+    tile : np.ndarray
+        uint8 tile of the unrotated pattern holding COLOR1 and COLOR2.
+    size : int
+        Size of the full square image in pixels.
+    extent : tuple of int
+        (rows, cols) of the unrotated image covered by the pattern.
+    layers : tuple of TileLayer
+        The background followed by each patch.
+    lut : np.ndarray or None
+        Color lookup table for the full-frame label map, if colors were given.
+    """
+    __slots__ = ()
+
+    @property
+    def nbytes(self):
+        total = self.tile.nbytes
+        for layer in self.layers:
+            if layer.mask_bits is not None:
+                total += layer.mask_bits.nbytes
+        if self.lut is not None:
+            total += self.lut.nbytes
+        return total
+
+
+def _pack_mask(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.uint8), (0, 0), (0, 0)
+    box = mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    return np.packbits(box), box.shape, (int(rows[0]), int(cols[0]))
+
+
+def _unpack_mask(layer, size):
+    if layer.mask_bits is None:
+        return np.ones((size, size), dtype=bool)
+    n_rows, n_cols = layer.mask_shape
+    box = np.unpackbits(layer.mask_bits, count=n_rows * n_cols).reshape(n_rows, n_cols)
+    mask = np.zeros((size, size), dtype=bool)
+    row, col = layer.offset
+    mask[row:row + n_rows, col:col + n_cols] = box
+    return mask
+
+
+def ouchi_tiles(size=512, num_strips=20, orientation=0, patches=(Patch(100, 90),),
+                background='circle', cycles_per_strip=16, colors=None):
+    """
+    Tile-texture form of an Ouchi pattern.
+
+    Instead of a full-resolution image this keeps one minimal periodic tile of
+    the unrotated pattern, a bit-packed mask for each layer and the layer
+    orientations. tiles_to_labels rebuilds the full label map from it.
+
+    Parameters:
+    -----------
+    size, num_strips, orientation, patches, background, cycles_per_strip :
+        As for ouchi_labels.
+    colors : sequence of (color1, color2) pairs, optional
+        As for color_lut; stored as the lookup table of the result.
+
+    Returns:
+    --------
+    tiles : OuchiTiles
+    """
+    if background not in BACKGROUNDS:
+        raise ValueError(f"Unknown background '{background}', expected one of {BACKGROUNDS}.")
+
+    layers = []
+    if background == 'circle':
+        layers.append(TileLayer(orientation, *_pack_mask(disc_mask(size, size // 2, (0, 0)))))
+    else:
+        layers.append(TileLayer(orientation, None, (size, size), (0, 0)))
+    for patch in patches:
+        patch = Patch(*patch)
+        mask = disc_mask(size, patch.radius, tuple(patch.center))
+        layers.append(TileLayer(patch.orientation, *_pack_mask(mask)))
+
+    return OuchiTiles(
+        tile=checker_tile(size, num_strips, cycles_per_strip),
+        size=size,
+        extent=pattern_extent(size, num_strips, cycles_per_strip),
+        layers=tuple(layers),
+        lut=None if colors is None else color_lut(colors),
+    )
+
+
+def tiles_to_labels(tiles):
+    """
+    Rebuild the full-frame label map of an OuchiTiles stimulus.
+
+    Parameters:
+    -----------
+    tiles : OuchiTiles
+
+    Returns:
+    --------
+    labels : np.ndarray
+        A (size x size) uint8 array, identical to ouchi_labels for the same parameters.
+    """
+    labels = np.zeros((tiles.size, tiles.size), dtype=np.uint8)
+    for layer_i, layer in enumerate(tiles.layers):
+        mask = _unpack_mask(layer, tiles.size)
+        layer_labels = tile_labels(tiles.tile, tiles.extent, tiles.size, layer.orientation)[mask]
+        labels[mask] = np.where(layer_labels == OUTSIDE, OUTSIDE, layer_labels + 2 * layer_i)
+    return labels
+
+
+def tiles_to_image(tiles, lut=None):
+    """
+    Rebuild the full-frame colored image of an OuchiTiles stimulus.
+
+    Parameters:
+    -----------
+    tiles : OuchiTiles
+    lut : np.ndarray, optional
+        Lookup table overriding the one stored in tiles.
+
+    Returns:
+    --------
+    image_arr : np.ndarray
+        A 3D NumPy array (size x size x 3) with the pattern.
+    """
+    lut = tiles.lut if lut is None else lut
+    if lut is None:
+        raise ValueError("No color lookup table given or stored in the tiles.")
+    return apply_colors(tiles_to_labels(tiles), lut)
+
+
+def generate_checker_pattern_with_patch(
+    num_strips=20, size=512, color1=[-1, -1, -1], color2=[1, 1, 1],
+    orientation=0, patch_radius=100, patch_orientation=90,
+    patch_color1=[-1, -1, -1], patch_color2=[1, 1, 1], background='circle',
+    as_tiles=False
+):
+    """
+    Generate a checkerboard-like pattern with a central circular patch.
+
+    Parameters:
+    -----------
+    num_strips : int
+        Number of strips to divide the image into (default=20).
+    size : int
+        Size of the resulting square image in pixels (default=512).
+    color1 : list of float
+        The "black" color for the main pattern (in PsychoPy color space).
+    color2 : list of float
+        The "white" color for the main pattern.
+    orientation : float
+        Orientation of the main pattern in degrees (default=0).
+    patch_radius : int
+        Radius of the central circular patch in pixels (default=100).
+    patch_orientation : float
+        Orientation of the circular patch in degrees (default=90).
+    patch_color1 : list of float
+        The "black" color for the patch (default matches main pattern).
+    patch_color2 : list of float
+        The "white" color for the patch (default matches main pattern).
+    background : str
+        'circle' for a circular mask on the background, 'square' for none (default='circle').
+        As in the original square-background script, 'square' snaps orientation and
+        patch_orientation down to a multiple of 90 degrees; use ouchi_labels with
+        background='square' for other angles.
+    as_tiles : bool
+        Return the compact OuchiTiles form instead of the full image (default=False).
+
+    Returns:
+    --------
+    image_arr : np.ndarray
+        A 3D NumPy array (size x size x 3) with the pattern, or OuchiTiles if as_tiles.
+    """
+    if background == 'square':
+        orientation, patch_orientation = (90 * ((angle % 360) // 90) for angle in (orientation, patch_orientation))
+    patches = [Patch(patch_radius, patch_orientation)]
+    colors = [(color1, color2), (patch_color1, patch_color2)]
+    if as_tiles:
+        return ouchi_tiles(size, num_strips, orientation, patches, background, colors=colors)
+    labels = ouchi_labels(size, num_strips, orientation, patches, background)
+    return apply_colors(labels, color_lut(colors))
+
+
+if __name__ == "__main__":
+    from psychopy import visual, event, core
+
+    # Create a PsychoPy window
+    win = visual.Window([800, 800], color=[0, 0, 0], units='pix')
+
+    # 'circle' masks the background to a disc, 'square' fills the whole image
+    background = 'circle'
+
+    # background contrast paramaters
+    bg_contrast_r_1 = 1
+    bg_contrast_g_1 = 1
+    bg_contrast_b_1 = 1
+    bg_contrast_r_2 = 1
+    bg_contrast_g_2 = 1
+    bg_contrast_b_2 = 1
+
+    # foreground contrast parameters
+    fg_contrast_r_1 = 1
+    fg_contrast_g_1 = 1
+    fg_contrast_b_1 = 1
+    fg_contrast_r_2 = 1
+    fg_contrast_g_2 = 1
+    fg_contrast_b_2 = 1
+
+    # Compute the geometry once: background at 45 deg, one central patch at -60 deg
+    labels = ouchi_labels(
+        size=512,
+        num_strips=128,
+        orientation=45,
+        patches=[Patch(radius=100, orientation=-60)],
+        background=background
+    )
+
+    # Colors come from a lookup table; changing contrasts only rebuilds the table
+    lut = color_lut([
+        ([-1*bg_contrast_r_1, -1*bg_contrast_g_1, -1*bg_contrast_b_1],
+         [1*bg_contrast_r_2, 1*bg_contrast_g_2, 1*bg_contrast_b_2]),
+        ([-1*fg_contrast_r_1, -1*fg_contrast_g_1, -1*fg_contrast_b_1],
+         [1*fg_contrast_r_2, 1*fg_contrast_g_2, 1*fg_contrast_b_2]),
+    ])
+    pattern = apply_colors(labels, lut)
+
+    # Create an ImageStim from the pattern
+    stim = visual.ImageStim(win, image=pattern, size=(512, 512))
+
+    # Draw and show
+    stim.draw()
+    win.flip()
+
+    # Wait for a key press to close
+    event.waitKeys()
+    win.close()
+    core.quit()
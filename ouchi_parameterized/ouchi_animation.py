@@ -0,0 +1,155 @@
+import numpy as np
+if __package__:
+    from .checker_render import OUTSIDE, checker_tile, tile_labels
+    from .ouchi import BACKGROUNDS, Patch, apply_colors, color_lut, disc_mask
+    from .ouchi_cache import encode_image
+else:
+    from checker_render import OUTSIDE, checker_tile, tile_labels
+    from ouchi import BACKGROUNDS, Patch, apply_colors, color_lut, disc_mask
+    from ouchi_cache import encode_image
+
+# Animated Ouchi stimuli. The background and each patch are rendered once as
+# label maps with a margin around them; every frame is then a shifted crop of
+# those maps composited through fixed apertures into a preallocated uint8 stack.
+# The textures move while the circular apertures stay put, which is what small
+# image jitter or eye movements do to the illusion.
+
+
+def jitter_offsets(n_frames, amplitude, rng=None):
+    """
+    Random integer (row, col) offsets, independent on every frame.
+
+    :param n_frames: Number of frames.
+    :param amplitude: Maximum shift in pixels along each axis.
+    :param rng: np.random.Generator to draw from (default: a fresh one).
+    :return: (n_frames x 2) int array of offsets in [-amplitude, amplitude].
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    return rng.integers(-amplitude, amplitude + 1, size=(n_frames, 2))
+
+
+def drift_offsets(n_frames, velocity):
+    """
+    Integer (row, col) offsets for a constant drift.
+
+    :param n_frames: Number of frames.
+    :param velocity: (rows, cols) drift in pixels per frame; may be fractional.
+    :return: (n_frames x 2) int array of offsets, starting at (0, 0).
+    """
+    return np.round(np.arange(n_frames)[:, None] * np.asarray(velocity, dtype=float)).astype(int)
+
+
+def _layer_base(tile, size, orientation, margin, layer_i):
+    base = tile_labels(tile, None, size, orientation, margin)
+    base = np.where(base == OUTSIDE, OUTSIDE, base + 2 * layer_i).astype(np.uint8)
+    return base
+
+
+def animate_ouchi(bg_offsets, patch_offsets=None, size=512, num_strips=20, orientation=0,
+                  patches=(Patch(100, 90),), background='circle', cycles_per_strip=16, out=None):
+    """
+    Label-map frames of an Ouchi pattern whose background and patches move independently.
+
+    :param bg_offsets: (n_frames x 2) integer (row, col) shifts of the background texture.
+    :param patch_offsets: (n_frames x 2) integer shifts shared by all patch textures
+                          (default: no patch motion).
+    :param size, num_strips, orientation, patches, background, cycles_per_strip:
+                          As for ouchi.ouchi_labels. The textures repeat without end,
+                          so shifting never uncovers the aperture.
+    :param out: Preallocated (n_frames x size x size) uint8 array to fill.
+    :return: (n_frames x size x size) uint8 stack of label maps; colour with
+             ouchi.apply_colors or frames_to_rgb.
+    """
+    if background not in BACKGROUNDS:
+        raise ValueError(f"Unknown background '{background}', expected one of {BACKGROUNDS}.")
+    bg_offsets = np.asarray(bg_offsets, dtype=int)
+    n_frames = len(bg_offsets)
+    if patch_offsets is None:
+        patch_offsets = np.zeros((n_frames, 2), dtype=int)
+    patch_offsets = np.asarray(patch_offsets, dtype=int)
+    if patch_offsets.shape != bg_offsets.shape:
+        raise ValueError("bg_offsets and patch_offsets must have the same shape.")
+
+    if out is None:
+        out = np.empty((n_frames, size, size), dtype=np.uint8)
+    elif out.shape != (n_frames, size, size) or out.dtype != np.uint8:
+        raise ValueError(f"out must be a uint8 array of shape {(n_frames, size, size)}.")
+
+    # Render each layer once, large enough for its biggest shift
+    tile = checker_tile(size, num_strips, cycles_per_strip)
+    bg_margin = int(np.abs(bg_offsets).max(initial=0))
+    patch_margin = int(np.abs(patch_offsets).max(initial=0))
+    bg_base = _layer_base(tile, size, orientation, bg_margin, 0)
+    bg_mask = disc_mask(size, size // 2) if background == 'circle' else None
+
+    # Patches only need their own bounding box of the base map
+    patch_layers = []
+    for patch_i, patch in enumerate(patches, start=1):
+        patch = Patch(*patch)
+        mask = disc_mask(size, patch.radius, tuple(patch.center))
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0:
+            continue
+        box = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        base = _layer_base(tile, size, patch.orientation, patch_margin, patch_i)
+        patch_layers.append((box, mask[box], base))
+
+    for frame_i in range(n_frames):
+        frame = out[frame_i]
+        dy, dx = bg_offsets[frame_i]
+        crop = bg_base[bg_margin - dy:bg_margin - dy + size, bg_margin - dx:bg_margin - dx + size]
+        if bg_mask is None:
+            frame[...] = crop
+        else:
+            frame.fill(OUTSIDE)
+            np.copyto(frame, crop, where=bg_mask)
+
+        dy, dx = patch_offsets[frame_i]
+        for (box_rows, box_cols), mask, base in patch_layers:
+            crop = base[patch_margin - dy + box_rows.start:patch_margin - dy + box_rows.stop,
+                        patch_margin - dx + box_cols.start:patch_margin - dx + box_cols.stop]
+            np.copyto(frame[box_rows, box_cols], crop, where=mask)
+    return out
+
+
+def frames_to_rgb(frames, lut, out=None):
+    """
+    Colour a label-map frame stack into uint8 RGB frames.
+
+    :param frames: uint8 label stack from animate_ouchi.
+    :param lut: Float lookup table in PsychoPy color space, from ouchi.color_lut.
+    :param out: Preallocated (n_frames x size x size x 3) uint8 array to fill.
+    :return: uint8 RGB frames, encoded as by ouchi_cache.encode_image (-1 to 1
+             onto 0 to 254, mid-grey at 127).
+    """
+    lut_u8 = encode_image(np.asarray(lut), 'uint8')
+    return np.take(lut_u8, frames, axis=0, out=out)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Three seconds at 60 Hz: background jitters by up to 3 px, patch stays still
+    n_frames = 180
+    start = time.perf_counter()
+    frames = animate_ouchi(jitter_offsets(n_frames, 3), size=512, num_strips=128,
+                           orientation=45, patches=[Patch(100, -60)])
+    elapsed = time.perf_counter() - start
+    print(f"{n_frames} frames in {elapsed * 1000:.0f} ms, {frames.nbytes / 1e6:.1f} MB")
+
+    from psychopy import visual, core, event
+
+    # Colour each frame into one reused float buffer
+    win = visual.Window([800, 800], color=[0, 0, 0], units='pix')
+    lut = color_lut([([-1, -1, -1], [1, 1, 1])] * 2)
+    frame_rgb = np.empty((512, 512, 3))
+    stim = visual.ImageStim(win, size=(512, 512))
+    frame_i = 0
+    while not event.getKeys():
+        stim.image = apply_colors(frames[frame_i % n_frames], lut, out=frame_rgb)
+        stim.draw()
+        win.flip()
+        frame_i += 1
+    win.close()
+    core.quit()
@@ -0,0 +1,185 @@
+import hashlib
+import inspect
+import json
+import os
+import numpy as np
+if __package__:
+    from .ouchi import generate_checker_pattern_with_patch
+else:
+    from ouchi import generate_checker_pattern_with_patch
+
+# Pre-session compilation of Ouchi stimuli. Every unique condition is rendered
+# once, in a process pool, and stored on disk under a hash of its parameters.
+# At session start images are memory-mapped back in, so opening the window is
+# followed by file loads rather than by rendering.
+
+# Bump when the renderer changes so stale images are never reused
+RENDER_VERSION = 3
+
+DTYPES = ('uint8', 'float16')
+
+
+def _stimulus_params(params):
+    # The generator's own arguments, so condition rows can carry extra columns
+    names = inspect.signature(generate_checker_pattern_with_patch).parameters
+    return {k: v for k, v in params.items() if k in names and k != 'as_tiles'}
+
+
+def _normalized_params(params):
+    bound = inspect.signature(generate_checker_pattern_with_patch).bind(**_stimulus_params(params))
+    bound.apply_defaults()
+    normalized = {}
+    for name, value in bound.arguments.items():
+        if isinstance(value, (list, tuple, np.ndarray)):
+            value = [float(v) for v in value]
+        elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            value = float(value)
+        normalized[name] = value
+    return normalized
+
+
+def encode_image(image_arr, dtype):
+    """
+    Convert a PsychoPy-space image in [-1, 1] to its on-disk representation.
+
+    :param image_arr: Float image in PsychoPy color space.
+    :param dtype: 'uint8' (0 to 254, so that 0 is stored exactly as 127) or
+                  'float16' (unchanged range).
+    :return: Encoded array.
+    """
+    if dtype == 'uint8':
+        return np.round((np.clip(image_arr, -1, 1) + 1) * 127).astype(np.uint8)
+    if dtype == 'float16':
+        return image_arr.astype(np.float16)
+    raise ValueError(f"Unknown cache dtype '{dtype}', expected one of {DTYPES}.")
+
+
+def decode_image(stored):
+    """
+    Convert a stored image back to a float image in PsychoPy color space.
+
+    :param stored: Array as returned by encode_image.
+    :return: float32 image in [-1, 1].
+    """
+    if stored.dtype == np.uint8:
+        return stored.astype(np.float32) / 127 - 1
+    return stored.astype(np.float32)
+
+
+def _render_to_file(params, path, dtype):
+    image_arr = encode_image(generate_checker_pattern_with_patch(**params), dtype)
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, image_arr)
+    os.replace(tmp_path, path)
+    return path
+
+
+class OuchiCache:
+    def __init__(self, cache_dir, dtype='uint8'):
+        """
+        Content-addressed disk cache of rendered Ouchi images.
+
+        :param cache_dir: Directory holding the cached images (created if missing).
+        :param dtype: Storage type, 'uint8' or 'float16'.
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown cache dtype '{dtype}', expected one of {DTYPES}.")
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, params):
+        """
+        Cache key for one condition: a hash of its full parameter set, defaults included.
+
+        :param params: Keyword arguments for generate_checker_pattern_with_patch;
+                       other keys, such as response columns, are ignored.
+        :return: Hex digest string.
+        """
+        payload = json.dumps({'version': RENDER_VERSION, 'dtype': self.dtype,
+                              'params': _normalized_params(params)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, params):
+        return os.path.join(self.cache_dir, self.key(params) + '.npy')
+
+    def __contains__(self, params):
+        return os.path.exists(self.path(params))
+
+    def compile(self, conditions, processes=None, verbose=False):
+        """
+        Render every unique condition that is not cached yet.
+
+        :param conditions: Condition table as a list of dicts of keyword arguments for
+                           generate_checker_pattern_with_patch, e.g. from
+                           psychopy.data.importConditions. Extra columns are ignored.
+        :param processes: Number of worker processes; None uses all cores and 0
+                          renders in this process.
+        :param verbose: Print progress.
+        :return: List of cache keys, one per row of conditions.
+        """
+        rows = [_stimulus_params(cond) for cond in conditions]
+        keys = [self.key(row) for row in rows]
+
+        todo = {}
+        for key, row in zip(keys, rows):
+            path = os.path.join(self.cache_dir, key + '.npy')
+            if key not in todo and not os.path.exists(path):
+                todo[key] = (row, path)
+        if verbose:
+            print(f'{len(set(keys))} unique conditions, {len(todo)} to render.')
+
+        if processes == 0:
+            for row, path in todo.values():
+                _render_to_file(row, path, self.dtype)
+        elif todo:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [pool.submit(_render_to_file, row, path, self.dtype)
+                           for row, path in todo.values()]
+                for future in futures:
+                    future.result()
+
+        for key, (row, _) in todo.items():
+            with open(os.path.join(self.cache_dir, key + '.json'), 'w') as f:
+                json.dump(_normalized_params(row), f, indent=1)
+        return keys
+
+    def load(self, params, decode=False, mmap=True):
+        """
+        Load one cached condition.
+
+        :param params: Keyword arguments for generate_checker_pattern_with_patch;
+                       other keys, such as response columns, are ignored.
+        :param decode: Return a float32 image in [-1, 1] instead of the stored array.
+        :param mmap: Memory-map the stored array rather than reading it into memory.
+        :return: Image array.
+        """
+        path = self.path(params)
+        if not os.path.exists(path):
+            raise KeyError(f"Condition not compiled: {_normalized_params(params)}")
+        stored = np.load(path, mmap_mode='r' if mmap else None)
+        return decode_image(stored) if decode else stored
+
+
+if __name__ == "__main__":
+    import itertools
+    import tempfile
+    import time
+
+    # Cross background and patch orientations with two contrast levels
+    conditions = [
+        dict(num_strips=128, orientation=ori, patch_orientation=patch_ori,
+             color1=[-c, -c, -c], color2=[c, c, c])
+        for ori, patch_ori, c in itertools.product([0, 45, 90], [-60, 0, 90], [0.5, 1.0])
+    ]
+
+    cache = OuchiCache(os.path.join(tempfile.gettempdir(), 'ouchi_cache'))
+    start = time.perf_counter()
+    cache.compile(conditions, verbose=True)
+    print(f'Compiled in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    images = [cache.load(cond) for cond in conditions]
+    print(f'Loaded {len(images)} images in {(time.perf_counter() - start) * 1000:.1f} ms')
@@ -0,0 +1,5 @@
+# PsychoPy ports of Peter Scarfe's Psychtoolbox demos, with the pieces they share:
+# dot fields and SFM spheres (dot_field, sfm_sphere), frame timing and scheduling
+# (frame_timer, frame_scheduler), background responses (response_collector) and
+# trial pre-compilation (trial_compiler). PsychoPy is only imported when a demo
+# runs. Import the submodule you need; nothing is imported here.
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Persistent dot-field renderer. One ElementArrayStim is built up front with a
+# fixed number of elements; each frame only the position, size and opacity
+# buffers are rewritten in place. Dots that should not be shown (e.g. behind the
+# screen plane) get zero opacity rather than being dropped, so the element count
+# and the stimulus' texture and mask never change.
+
+
+class DotField:
+    def __init__(self, win, n_dots, colors=None, units='pix', element_mask='circle',
+                 stim_class=None):
+        """
+        :param win: PsychoPy window to draw into.
+        :param n_dots: Fixed number of dots.
+        :param colors: (n_dots x 3) RGB colours in PsychoPy color space (default white).
+        :param units: Units of positions and sizes.
+        :param element_mask: Mask of each element, e.g. 'circle' or 'gauss'.
+        :param stim_class: Element array class to instantiate, for stand-ins when no
+                           display is available (default psychopy.visual.ElementArrayStim).
+        """
+        self.n_dots = n_dots
+        self.xys = np.zeros((n_dots, 2))
+        self.sizes = np.ones(n_dots)
+        self.opacities = np.ones(n_dots)
+        self.colors = np.ones((n_dots, 3))
+        if colors is not None:
+            np.copyto(self.colors, colors)
+
+        if stim_class is None:
+            from psychopy.visual import ElementArrayStim as stim_class
+        self.stim = stim_class(win, units=units, nElements=n_dots,
+                               xys=self.xys, sizes=self.sizes, colors=self.colors,
+                               opacities=self.opacities, elementMask=element_mask,
+                               elementTex=None)
+
+    def update(self, xys, sizes=None, visible=None):
+        """
+        Overwrite the dot buffers for the next frame.
+
+        :param xys: (n_dots x 2) positions.
+        :param sizes: (n_dots,) sizes, or None to keep the current ones.
+        :param visible: (n_dots,) booleans or opacities in [0, 1], or None to keep
+                        the current ones.
+        """
+        np.copyto(self.xys, xys)
+        self.stim.xys = self.xys
+        if sizes is not None:
+            np.copyto(self.sizes, sizes)
+            self.stim.sizes = self.sizes
+        if visible is not None:
+            np.copyto(self.opacities, visible)
+            self.stim.opacities = self.opacities
+
+    def set_colors(self, colors):
+        """
+        :param colors: (n_dots x 3) RGB colours in PsychoPy color space.
+        """
+        np.copyto(self.colors, colors)
+        self.stim.colors = self.colors
+
+    def draw(self):
+        self.stim.draw()
@@ -0,0 +1,172 @@
+import time
+from collections import namedtuple
+import numpy as np
+
+# Frame-locked stimulus scheduling. A timeline of on/off events is converted
+# once, using the measured inter-frame interval (ifi), into the frame indices at
+# which the display changes and the set of stimuli shown from each of them. The
+# scheduler then flips only at those frames. Each flip is requested half a frame
+# before its target refresh, which is the same as Psychtoolbox's
+# Screen('Flip', win, vbl + (waitframes - 0.5) * ifi). Targets are measured from
+# one starting flip, so a late flip does not push back the flips after it.
+
+Timeline = namedtuple('Timeline', ['frames', 'states', 'n_frames', 'ifi'])
+
+
+def to_frames(times, ifi):
+    """
+    :param times: Times in seconds.
+    :param ifi: Inter-frame interval in seconds.
+    :return: The nearest whole frame for each time, as an int array.
+    """
+    return np.round(np.asarray(times, dtype=float) / ifi).astype(int)
+
+
+def flash_events(rate, duration, start=0.0, duty=0.5, stim_index=0):
+    """
+    On/off events for a stimulus flashing at a fixed rate.
+
+    :param rate: Flashes per second.
+    :param duration: Total duration in seconds.
+    :param start: Onset of the first flash in seconds.
+    :param duty: Fraction of each cycle the stimulus is on.
+    :param stim_index: Index of the stimulus the events refer to.
+    :return: (n_flashes x 3) array of (stim_index, on, off) rows, in seconds.
+    """
+    onsets = start + np.arange(int(round(duration * rate))) / rate
+    return np.column_stack([np.full(len(onsets), stim_index), onsets, onsets + duty / rate])
+
+
+def compile_timeline(events, ifi, n_stims=None, units='s', n_frames=None):
+    """
+    Convert on/off events into the frames at which the display changes.
+
+    :param events: Sequence of (stim_index, on, off) rows; each stimulus is shown from
+                   on up to, but not including, off.
+    :param ifi: Inter-frame interval in seconds, e.g. win.monitorFramePeriod.
+    :param n_stims: Number of stimuli (default: the largest stim_index + 1).
+    :param units: 's' if on and off are in seconds, 'frames' if they are frame indices.
+    :param n_frames: Length of the timeline in frames (default: the last offset).
+    :return: Timeline with frames (int array of frames where the display changes,
+             starting at 0), states ((len(frames) x n_stims) booleans, which stimuli
+             are shown from each of those frames), n_frames and ifi.
+    """
+    events = np.asarray(events, dtype=float).reshape(-1, 3)
+    stim_i = events[:, 0].astype(int)
+    if units == 's':
+        on, off = to_frames(events[:, 1], ifi), to_frames(events[:, 2], ifi)
+    elif units == 'frames':
+        on, off = events[:, 1].astype(int), events[:, 2].astype(int)
+    else:
+        raise ValueError(f"Unknown units '{units}', expected 's' or 'frames'.")
+    if np.any(on < 0) or np.any(off < on):
+        raise ValueError("Events must have 0 <= on <= off.")
+
+    if n_stims is None:
+        n_stims = stim_i.max(initial=-1) + 1
+    if n_frames is None:
+        n_frames = int(off.max(initial=0))
+
+    # The display can only change where some event starts or stops
+    frames = np.unique(np.concatenate([[0, n_frames], on, off]))
+    frames = frames[frames <= n_frames]
+    active = (on <= frames[:, None]) & (frames[:, None] < off)
+    counts = np.zeros((n_stims, len(frames)), dtype=int)
+    np.add.at(counts, stim_i, active.T)
+    states = counts.T > 0
+
+    # Back-to-back events leave the display unchanged; no flip is needed there
+    changed = np.concatenate([[True], np.any(states[1:] != states[:-1], axis=1)])
+    return Timeline(frames[changed], states[changed], n_frames, ifi)
+
+
+class FrameScheduler:
+    def __init__(self, ifi, get_time=None, sleep=time.sleep, spin_margin=0.002):
+        """
+        :param ifi: Inter-frame interval in seconds, e.g. win.monitorFramePeriod.
+        :param get_time: Clock function on the same timebase as the flip timestamps
+                         (default psychopy.core.getTime, which win.flip() also uses).
+        :param sleep: Function that sleeps for a number of seconds.
+        :param spin_margin: The last part of each wait, in seconds, is spent polling
+                            the clock rather than sleeping, because sleep() can
+                            overshoot by about a millisecond.
+        """
+        if get_time is None:
+            from psychopy.core import getTime as get_time
+        self.ifi = ifi
+        self.get_time = get_time
+        self.sleep = sleep
+        self.spin_margin = spin_margin
+
+    def wait_until(self, when):
+        remaining = when - self.get_time()
+        if remaining > self.spin_margin:
+            self.sleep(remaining - self.spin_margin)
+        if self.spin_margin > 0:
+            while self.get_time() < when:
+                pass
+
+    def show(self, win, stims, state, when):
+        """
+        Draw the stimuli shown in one timeline state and flip at the requested time.
+
+        :param win: PsychoPy window (or stand-in with a flip method).
+        :param stims: One object with a draw() method per stimulus.
+        :param state: Booleans, which stimuli are shown.
+        :param when: Time to flip at; the flip is immediate if it has passed.
+        :return: The flip timestamp.
+        """
+        for stim, shown in zip(stims, state):
+            if shown:
+                stim.draw()
+        self.wait_until(when)
+        return win.flip()
+
+    def run(self, win, timeline, stims, check_abort=None):
+        """
+        Show a compiled timeline, flipping only where the display changes.
+
+        :param win: PsychoPy window (or stand-in with a flip method).
+        :param timeline: Timeline from compile_timeline.
+        :param stims: One object with a draw() method per stimulus in the timeline.
+        :param check_abort: Optional function called after every flip; the run stops
+                            early when it returns True.
+        :return: Tuple of (flip_times, missed): the timestamp of each flip (NaN if not
+                 reached) and how many refreshes late it landed.
+        """
+        ifi = self.ifi
+        n = len(timeline.frames)
+        flip_times = np.full(n, np.nan)
+
+        # Frame 0 is the refresh after this one
+        start = win.flip()
+        targets = start + (timeline.frames + 1) * ifi
+        for k in range(n):
+            flip_times[k] = self.show(win, stims, timeline.states[k], targets[k] - 0.5 * ifi)
+            if check_abort is not None and check_abort():
+                break
+
+        missed = np.round((flip_times - targets) / ifi)
+        return flip_times, missed
+
+
+if __name__ == "__main__":
+    if __package__:
+        from .frame_timer import FakeClock
+    else:
+        from frame_timer import FakeClock
+
+    class NullStim:
+        def draw(self):
+            pass
+
+    # Headless example: a 10 Hz flash and a 4 Hz flash for 1 s on a 144 Hz display
+    clock = FakeClock(1 / 144, drop_frames=(5,))
+    events = np.concatenate([flash_events(10, 1.0, stim_index=0), flash_events(4, 1.0, stim_index=1)])
+    timeline = compile_timeline(events, clock.ifi)
+    scheduler = FrameScheduler(clock.ifi, get_time=clock.getTime, sleep=clock.advance, spin_margin=0)
+    flip_times, missed = scheduler.run(clock, timeline, [NullStim(), NullStim()])
+
+    print(f"{timeline.n_frames} frames, {len(timeline.frames)} flips")
+    for frame, state, t, late in zip(timeline.frames, timeline.states, flip_times, missed):
+        print(f"frame {frame:4d}  t={t * 1000:7.2f} ms  shown={state.astype(int)}  late={late:.0f}")
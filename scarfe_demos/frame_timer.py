@@ -0,0 +1,206 @@
+import numpy as np
+
+# Frame timing recorder for flip loops. Flip timestamps and draw-phase durations
+# go into fixed-size ring buffers, so recording a frame never allocates, and
+# dropped frames are detected as they happen by comparing each flip interval with
+# the measured inter-frame interval (ifi).
+
+
+class FrameTimer:
+    def __init__(self, ifi, capacity=36000, get_time=None, late_fraction=0.5, on_drop=None):
+        """
+        :param ifi: Inter-frame interval in seconds, e.g. win.monitorFramePeriod.
+        :param capacity: Number of most recent frames kept (36000 is 10 min at 60 Hz).
+        :param get_time: Clock function on the same timebase as the flip timestamps
+                         (default psychopy.core.getTime, which win.flip() also uses).
+        :param late_fraction: A flip interval longer than (1 + late_fraction) * ifi
+                              counts as late.
+        :param on_drop: Optional callback, called as on_drop(frame_index, n_missed)
+                        whenever frames are dropped.
+        """
+        if get_time is None:
+            from psychopy.core import getTime as get_time
+        self.ifi = ifi
+        self.capacity = capacity
+        self.get_time = get_time
+        self.late_fraction = late_fraction
+        self.on_drop = on_drop
+
+        self.flip_times = np.zeros(capacity)
+        self.draw_durations = np.zeros(capacity)
+        self.missed = np.zeros(capacity, dtype=np.int32)
+        self.reset()
+
+    def reset(self):
+        self.n_frames = 0
+        self.n_dropped = 0
+        self.n_late = 0
+        self._draw_start = None
+        self._draw_end = None
+        self._last_flip = None
+
+    def begin_draw(self):
+        """Mark the start of this frame's drawing."""
+        self._draw_start = self.get_time()
+
+    def end_draw(self):
+        """Mark the end of this frame's drawing, just before the flip."""
+        self._draw_end = self.get_time()
+
+    def record_flip(self, vbl):
+        """
+        Record a flip timestamp and check it against the previous one.
+
+        :param vbl: Timestamp returned by win.flip().
+        :return: Number of frames missed before this flip (0 if on time).
+        """
+        i = self.n_frames % self.capacity
+        self.flip_times[i] = vbl
+        if self._draw_start is not None and self._draw_end is not None:
+            self.draw_durations[i] = self._draw_end - self._draw_start
+        else:
+            self.draw_durations[i] = np.nan
+        self._draw_start = self._draw_end = None
+
+        n_missed = 0
+        if self._last_flip is not None:
+            interval = vbl - self._last_flip
+            if interval > (1 + self.late_fraction) * self.ifi:
+                self.n_late += 1
+                n_missed = max(int(round(interval / self.ifi)) - 1, 1)
+                self.n_dropped += n_missed
+        self.missed[i] = n_missed
+        self._last_flip = vbl
+        self.n_frames += 1
+
+        if n_missed and self.on_drop is not None:
+            self.on_drop(self.n_frames - 1, n_missed)
+        return n_missed
+
+    def flip(self, win, *args, **kwargs):
+        """
+        End the draw phase, flip the window and record the flip.
+
+        :param win: PsychoPy window (or stand-in with a flip method).
+        :return: The flip timestamp.
+        """
+        self.end_draw()
+        vbl = win.flip(*args, **kwargs)
+        self.record_flip(vbl)
+        return vbl
+
+    def _ordered(self, buffer):
+        # Oldest to newest over the frames still held in the ring buffer
+        n = min(self.n_frames, self.capacity)
+        start = self.n_frames % self.capacity if self.n_frames > self.capacity else 0
+        return np.roll(buffer, -start)[:n] if start else buffer[:n].copy()
+
+    def intervals(self):
+        """Flip-to-flip intervals in seconds over the retained frames."""
+        return np.diff(self._ordered(self.flip_times))
+
+    def deviations(self):
+        """Flip intervals minus the expected ifi, in seconds."""
+        return self.intervals() - self.ifi
+
+    def percentiles(self, q=(50, 90, 99, 100)):
+        """
+        :param q: Percentiles to compute.
+        :return: Dict with the requested percentiles of the flip intervals and of the
+                 draw durations, in milliseconds.
+        """
+        draws = self._ordered(self.draw_durations)
+        draws = draws[~np.isnan(draws)]
+        intervals = self.intervals()
+        return {
+            'interval_ms': dict(zip(q, (np.percentile(intervals, q) * 1000).tolist())) if len(intervals) else {},
+            'draw_ms': dict(zip(q, (np.percentile(draws, q) * 1000).tolist())) if len(draws) else {},
+        }
+
+    def histogram(self, bins=None):
+        """
+        :param bins: Bin edges in milliseconds (default: quarter-frame bins centred on
+                     whole and fractional frames, up to four frames).
+        :return: Tuple of (counts, bin_edges_ms) for the flip intervals.
+        """
+        if bins is None:
+            bins = (np.arange(0, 4.25, 0.25) + 0.125) * self.ifi * 1000
+        return np.histogram(self.intervals() * 1000, bins=bins)
+
+    def summary(self):
+        deviations = self.deviations()
+        return {
+            'n_frames': self.n_frames,
+            'n_dropped': self.n_dropped,
+            'n_late': self.n_late,
+            'ifi_ms': self.ifi * 1000,
+            'mean_deviation_ms': float(np.mean(deviations) * 1000) if len(deviations) else np.nan,
+            'sd_deviation_ms': float(np.std(deviations) * 1000) if len(deviations) else np.nan,
+        }
+
+    def save(self, path):
+        """
+        Write a compact timing log of the retained frames to a .npz file.
+
+        :param path: Output file name.
+        """
+        np.savez_compressed(
+            path,
+            flip_times=self._ordered(self.flip_times),
+            draw_durations=self._ordered(self.draw_durations).astype(np.float32),
+            missed=self._ordered(self.missed).astype(np.uint8 if self.missed.max(initial=0) < 256 else np.int32),
+            ifi=self.ifi,
+            n_frames=self.n_frames,
+            n_dropped=self.n_dropped,
+            n_late=self.n_late,
+        )
+
+
+class FakeClock:
+    def __init__(self, ifi, start=0.0, drop_frames=(), draw_time=0.0):
+        """
+        Headless stand-in for the display clock and window flip.
+
+        Time only moves when flip() or advance() is called. Flips land on the next
+        refresh after the requested time; frames listed in drop_frames are held
+        for one extra refresh, as if the deadline had been missed.
+
+        :param ifi: Simulated inter-frame interval in seconds.
+        :param start: Time of the first refresh.
+        :param drop_frames: Indices of flips that miss their refresh.
+        :param draw_time: Seconds added by each advance() call, to simulate drawing.
+        """
+        self.ifi = ifi
+        self.now = start
+        self.drop_frames = set(drop_frames)
+        self.draw_time = draw_time
+        self.n_flips = 0
+
+    def getTime(self):
+        return self.now
+
+    def advance(self, seconds=None):
+        self.now += self.draw_time if seconds is None else seconds
+
+    def flip(self, when=None):
+        target = self.now if when is None else max(self.now, when)
+        vbl = (np.floor(target / self.ifi + 1e-9) + 1) * self.ifi
+        if self.n_flips in self.drop_frames:
+            vbl += self.ifi
+        self.n_flips += 1
+        self.now = vbl
+        return vbl
+
+
+if __name__ == "__main__":
+    # Headless example: 600 simulated frames at 60 Hz with three dropped frames
+    clock = FakeClock(1 / 60, drop_frames=(100, 250, 251), draw_time=0.004)
+    timer = FrameTimer(clock.ifi, get_time=clock.getTime,
+                       on_drop=lambda frame, n: print(f'Frame {frame}: {n} frame(s) dropped'))
+    for frame in range(600):
+        timer.begin_draw()
+        clock.advance()
+        timer.flip(clock)
+
+    print(timer.summary())
+    print(timer.percentiles())
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+# Background response collection. A daemon thread polls one or more input sources
+# and appends timestamped responses to a deque, which the trial loop drains
+# without blocking. deque.append and deque.popleft are atomic, so the two sides
+# never take a lock. The timestamps come from the source where it has them (the
+# psychtoolbox keyboard queue stamps key presses in its own thread) and from the
+# collector's clock otherwise. Key presses are stamped with KeyPress.tDown, which
+# the psychtoolbox backend reports on logging.defaultClock, the clock win.flip()
+# timestamps come from (the keyboard's own clock only affects .rt). All times are
+# therefore on the flip timebase, and a reaction time is simply
+# response.time - onset_flip_time.
+
+Response = namedtuple('Response', ['name', 'time'])
+
+
+def keyboard_source(keyboard=None):
+    """
+    Key presses from psychopy.hardware.keyboard, stamped by the keyboard queue.
+
+    :param keyboard: psychopy.hardware.keyboard.Keyboard to read (default: a new one).
+    :return: Source function returning a list of (key_name, press_time) pairs, the
+             press time being KeyPress.tDown, on the win.flip() timebase.
+    """
+    from psychopy.hardware import keyboard as kb_module
+    if not kb_module.havePTB:
+        raise RuntimeError("Background key collection needs the psychtoolbox keyboard "
+                           "backend; install the psychtoolbox package.")
+    if keyboard is None:
+        keyboard = kb_module.Keyboard()
+
+    def poll():
+        return [(key.name, key.tDown) for key in keyboard.getKeys(waitRelease=False, clear=True)]
+    return poll
+
+
+def mouse_source(mouse, names=('mouse_left', 'mouse_middle', 'mouse_right')):
+    """
+    Mouse button presses, reported when a button goes down.
+
+    The press is stamped with the time it was first seen, so its precision is the
+    poll interval, and only as good as how often the backend updates the button
+    state.
+
+    :param mouse: psychopy.event.Mouse (or anything with getPressed()).
+    :param names: Response names for each button.
+    :return: Source function returning a list of (button_name, None) pairs.
+    """
+    previous = [False] * len(names)
+
+    def poll():
+        pressed = mouse.getPressed()
+        presses = [(name, None) for name, now, before in zip(names, pressed, previous) if now and not before]
+        previous[:] = [bool(p) for p in pressed[:len(names)]]
+        return presses
+    return poll
+
+
+def scripted_source(responses, get_time):
+    """
+    Replays (name, time) responses once their time has passed, for headless runs.
+
+    :param responses: Sequence of (name, time) pairs in time order.
+    :param get_time: Clock the times refer to.
+    :return: Source function returning a list of (name, time) pairs.
+    """
+    pending = deque(responses)
+
+    def poll():
+        now = get_time()
+        due = []
+        while pending and pending[0][1] <= now:
+            due.append(pending.popleft())
+        return due
+    return poll
+
+
+class ResponseCollector:
+    def __init__(self, sources, get_time=None, poll_interval=0.001, capacity=10000):
+        """
+        :param sources: Functions that each return a list of (name, time) pairs of new
+                        responses since the last call; time may be None to use the
+                        collector's clock at the moment of the poll.
+        :param get_time: Clock function on the same timebase as the flip timestamps
+                         (default psychopy.core.getTime, which win.flip() also uses).
+        :param poll_interval: Seconds between polls of the sources.
+        :param capacity: Maximum number of undrained responses kept; the oldest are
+                         dropped beyond that.
+        """
+        if get_time is None:
+            from psychopy.core import getTime as get_time
+        self.sources = list(sources)
+        self.get_time = get_time
+        self.poll_interval = poll_interval
+        self.responses = deque(maxlen=capacity)
+        self._new_response = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ResponseCollector', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def poll(self):
+        """Read every source once and queue what they return."""
+        found = False
+        for source in self.sources:
+            for name, t in source():
+                self.responses.append(Response(name, self.get_time() if t is None else t))
+                found = True
+        if found:
+            self._new_response.set()
+        return found
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.poll_interval)
+
+    def drain(self, names=None):
+        """
+        Take all queued responses without blocking.
+
+        :param names: Only return responses with these names; others are discarded.
+        :return: List of Response(name, time), oldest first.
+        """
+        drained = []
+        while True:
+            try:
+                response = self.responses.popleft()
+            except IndexError:
+                break
+            if names is None or response.name in names:
+                drained.append(response)
+        return drained
+
+    def clear(self):
+        self.responses.clear()
+
+    def wait(self, names=None, timeout=None):
+        """
+        Block until a response arrives, sleeping rather than polling.
+
+        :param names: Only return once one of these names arrives (default: any).
+        :param timeout: Maximum wait in seconds (default: no limit).
+        :return: List of the matching responses, or an empty list on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._new_response.clear()
+            drained = self.drain(names)
+            if drained:
+                return drained
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            self._new_response.wait(remaining)
+
+
+if __name__ == "__main__":
+    # Headless example: three scripted key presses collected in the background
+    # while the main thread simulates a 60 Hz draw loop
+    start = time.perf_counter()
+    script = [('space', start + 0.105), ('left', start + 0.2333), ('escape', start + 0.4)]
+    with ResponseCollector([scripted_source(script, time.perf_counter)],
+                           get_time=time.perf_counter) as collector:
+        frame = 0
+        while True:
+            responses = collector.drain()
+            for name, t in responses:
+                print(f"frame {frame:3d}: '{name}' at {(t - start) * 1000:.1f} ms")
+            if any(name == 'escape' for name, _ in responses):
+                break
+            time.sleep(1 / 60)
+            frame += 1
@@ -1,115 +1,365 @@
-from psychopy import visual, core, event, monitors
 import numpy as np
+if __package__:
+    from .dot_field import DotField
+else:
+    from dot_field import DotField
 
-# Clear the workspace
-# PsychoPy clears variables at the start, unlike MATLAB
+# Stream identifiers for the counter-based random draws in SphereTrajectory
+_STREAM_LIFE_PHASE = 1
+_STREAM_THETA = 2
+_STREAM_PHI = 3
+_STREAM_SPEED = 4
 
-# Set up default settings for PsychoPy
-np.random.seed()
 
-# Screen initialization
-monitor = monitors.Monitor('testMonitor')  # Create a monitor profile (change 'testMonitor' as needed)
-screenid = 0  # Assuming single screen setup, otherwise use max(screenids) equivalent
+def sphere_dot_coords(num_dots, radius, rng=None):
+    """
+    Dots distributed uniformly over the surface of a sphere.
 
-# Determine the values of black and white
-black = [0, 0, 0]
-white = [1, 1, 1]
+    :param num_dots: Number of dots.
+    :param radius: Sphere radius.
+    :param rng: np.random.Generator to draw from (default: a fresh one).
+    :return: (3 x num_dots) array of x, y, z coordinates.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    th = 2 * np.pi * rng.random(num_dots)
+    ph = np.arcsin(-1 + 2 * rng.random(num_dots))
+    return radius * np.array([np.cos(th) * np.cos(ph),
+                              np.sin(th) * np.cos(ph),
+                              np.sin(ph)])
 
-# Set up our screen
-win = visual.Window(color=black, fullscr=True, units='pix', monitor=monitor)
 
-# Get the vertical refresh rate of the monitor
-ifi = win.getMsPerFrame(nFrames=60, showVisual=False)[0] / 1000.0
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
 
-# Get the width and height of the window in pixels
-screenXpix, screenYpix = win.size
 
-# Determine the center of the screen
-center = [screenXpix / 2, screenYpix / 2]
+def _hash_uniform(seed, stream, dot_i, generation):
+    """
+    Uniform [0, 1) numbers that depend only on (seed, stream, dot, generation), so
+    a respawned dot lands in the same place whichever order frames are asked for.
+    """
+    with np.errstate(over='ignore'):
+        x = _splitmix64(np.full(len(dot_i), seed ^ stream, dtype=np.uint64))
+        x = _splitmix64(x + np.asarray(dot_i).astype(np.uint64))
+        x = _splitmix64(x + np.asarray(generation).astype(np.uint64))
+    return (x >> np.uint64(11)) * (1.0 / (1 << 53))
 
-# Get the physical dimensions of the monitor
-widthMM, heightMM = monitor.getSizePix()
-if widthMM is None or heightMM is None:
-    widthMM, heightMM = 520, 320  # Use default values if monitor size is not specified
 
-# Convert to centimeters
-screenYcm = heightMM / 10
-screenXcm = widthMM / 10
-pixPerCm = np.mean([screenXpix / screenXcm, screenYpix / screenYcm])
+class SphereTrajectory:
+    def __init__(self, dot_coords, deg_per_frame, max_depth, dot_size_range, start_angle=0.0,
+                 lifetime=None, coherence=1.0, viewing_distance=None, seed=None):
+        """
+        Closed-form dot positions, visibility and sizes for a sphere rotating about
+        the vertical axis. Every frame is computed directly from its frame index, so
+        there is no accumulated drift and any frame can be reproduced exactly, in
+        any order. All work is done on arrays over the dots in preallocated buffers.
 
-# Set the blend function so that we get nice antialiased edges to the dots defining our cylinder
-win.setBlendMode('avg')
+        :param dot_coords: (3 x n_dots) dot coordinates at the start angle.
+        :param deg_per_frame: Rotation per frame in degrees.
+        :param max_depth: Depth at which dots reach their largest size.
+        :param dot_size_range: (min, max) dot size, for depth 0 and max_depth.
+        :param start_angle: Rotation of the first frame in degrees.
+        :param lifetime: Dot lifetime in frames, or None for dots that live forever.
+                         Dots start at random ages and are respawned at a random
+                         place on the surface when they expire.
+        :param coherence: Fraction of dots rotating with the sphere. The rest rotate
+                          about the same axis at a random speed between
+                          -deg_per_frame and deg_per_frame, drawn anew at each respawn.
+        :param viewing_distance: Eye to screen distance in the units of dot_coords for
+                                 perspective projection, or None for orthographic.
+                                 With perspective only the surface facing the eye is
+                                 shown; the eye must be outside the sphere.
+        :param seed: Integer seed for lifetimes, respawn positions and noise speeds.
+        """
+        init = np.asarray(dot_coords, dtype=float)
+        self.n_dots = init.shape[1]
+        self.deg_per_frame = deg_per_frame
+        self.start_angle = start_angle
+        self.max_depth = max_depth
+        self.dot_size_range = dot_size_range
+        self.lifetime = lifetime
+        self.coherence = coherence
+        self.viewing_distance = viewing_distance
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2**63))
+        self.seed = seed
 
-# Stimulus information
-sphereRadius = 14  # Radius of the sphere in cm
-maxDepthPix = sphereRadius * pixPerCm  # Maximum depth in pixels
-sphereSurfArea = 4 * np.pi * sphereRadius**2  # Surface area of the sphere
-dotDensity = 2
-numDots = round(dotDensity * sphereSurfArea)  # Specify the number of dots we want on the sphere
+        # Starting coordinates and per-dot radius, kept for generation 0 and respawns
+        self._init = init
+        self._radius = np.sqrt(np.sum(init ** 2, axis=0))
+        self._r_sq = self._radius ** 2
+        if viewing_distance is not None and viewing_distance <= self._radius.max(initial=0):
+            raise ValueError(f"viewing_distance ({viewing_distance}) must be larger than the sphere "
+                             f"radius ({self._radius.max():.4g}).")
+        self._dot_i = np.arange(self.n_dots)
+        self._is_signal = self._dot_i < round(coherence * self.n_dots)
+        if lifetime is None:
+            self._life_phase = np.zeros(self.n_dots, dtype=np.int64)
+        else:
+            phase = _hash_uniform(seed, _STREAM_LIFE_PHASE, self._dot_i, 0)
+            self._life_phase = np.floor(phase * lifetime).astype(np.int64)
 
-# Uniformly distribute the points in spherical space
-th = 2 * np.pi * np.random.rand(numDots)
-ph = np.arcsin(-1 + 2 * np.random.rand(numDots))
+        # Current object-frame coordinates, generation and motion of every dot
+        self.x, self.y, self.z = (c.copy() for c in init)
+        self._generation = np.zeros(self.n_dots, dtype=np.int64)
+        self._speed = np.empty(self.n_dots)
+        self._phase = np.empty(self.n_dots)
+        self._set_motion(self._dot_i)
 
-# Convert the point coordinates into Cartesian space
-sphereCoordsX = sphereRadius * np.cos(th) * np.cos(ph)
-sphereCoordsY = sphereRadius * np.sin(th) * np.cos(ph)
-sphereCoordsZ = sphereRadius * np.sin(ph)
+        # Per-frame output buffers, rewritten in place by frame()
+        self.xys = np.empty((self.n_dots, 2))
+        self.depths = np.empty(self.n_dots)
+        self.sizes = np.empty(self.n_dots)
+        self.visible = np.empty(self.n_dots, dtype=bool)
+        self._new_generation = np.empty(self.n_dots, dtype=np.int64)
+        self._angles = np.empty(self.n_dots)
+        self._cos = np.empty(self.n_dots)
+        self._sin = np.empty(self.n_dots)
+        self._scratch = np.empty(self.n_dots)
 
-# Convert to pixels
-sphereCoordsX = sphereCoordsX * pixPerCm
-sphereCoordsY = sphereCoordsY * pixPerCm
-sphereCoordsZ = sphereCoordsZ * pixPerCm
+    def _set_motion(self, idx):
+        # Signal dots share the sphere's rotation; noise dots get their own speed,
+        # measured from the frame on which they were born
+        gen = self._generation[idx]
+        signal = self._is_signal[idx]
+        noise_speed = (2 * _hash_uniform(self.seed, _STREAM_SPEED, idx, gen) - 1) * self.deg_per_frame
+        self._speed[idx] = np.where(signal, self.deg_per_frame, noise_speed)
+        if self.lifetime is None:
+            birth = np.zeros(len(idx))
+        else:
+            birth = gen * self.lifetime - self._life_phase[idx]
+        self._phase[idx] = self.start_angle + np.where(signal, 0.0, -noise_speed * birth)
 
-# Maximum and minimum depth possible
-minMaxDepth = np.array([0, 1]) * sphereRadius * pixPerCm
+    def _respawn(self, frame_i):
+        np.add(self._life_phase, frame_i, out=self._new_generation)
+        np.floor_divide(self._new_generation, self.lifetime, out=self._new_generation)
+        idx = np.flatnonzero(self._new_generation != self._generation)
+        if len(idx) == 0:
+            return
+        gen = self._new_generation[idx]
+        self._generation[idx] = gen
 
-# The dot coordinates: these coordinates are 3D
-dotCoordsAll = np.array([sphereCoordsX, sphereCoordsY, sphereCoordsZ])
+        # Generation 0 is the given starting layout, later ones are fresh surface points
+        th = 2 * np.pi * _hash_uniform(self.seed, _STREAM_THETA, idx, gen)
+        ph = np.arcsin(2 * _hash_uniform(self.seed, _STREAM_PHI, idx, gen) - 1)
+        r = self._radius[idx]
+        first = gen == 0
+        self.x[idx] = np.where(first, self._init[0, idx], r * np.cos(th) * np.cos(ph))
+        self.y[idx] = np.where(first, self._init[1, idx], r * np.sin(th) * np.cos(ph))
+        self.z[idx] = np.where(first, self._init[2, idx], r * np.sin(ph))
+        self._set_motion(idx)
 
-# Set the dot size in pixels
-dotMinSizePixels = 4
-dotMaxSizePixels = 8
+    def _depth_to_size(self, depths, out):
+        # Linear in depth between the two sizes, clamped like np.interp
+        min_size, max_size = self.dot_size_range
+        np.multiply(depths, 1.0 / self.max_depth, out=out)
+        np.clip(out, 0.0, 1.0, out=out)
+        out *= max_size - min_size
+        out += min_size
+        return out
 
-# Randomly color the dots
-dotColors = np.random.rand(3, numDots) * 2 - 1  # Scale colors from [0, 1] to [-1, 1]
+    def _compute(self, frame_i, xys, sizes, visible):
+        if self.lifetime is not None:
+            self._respawn(frame_i)
 
-# Update the stimulus on each frame
-waitframes = 1
+        np.multiply(self._speed, frame_i, out=self._angles)
+        self._angles += self._phase
+        np.radians(self._angles, out=self._angles)
+        np.cos(self._angles, out=self._cos)
+        np.sin(self._angles, out=self._sin)
 
-# Start angle and the angle in degrees that we will rotate per frame
-angle = 0
-degPerFrame = 0.3
-rotYmat = np.array([[np.cos(np.radians(degPerFrame)), 0, np.sin(np.radians(degPerFrame))],
-                    [0, 1, 0],
-                    [-np.sin(np.radians(degPerFrame)), 0, np.cos(np.radians(degPerFrame))]])
+        # x' = x cos a + z sin a
+        np.multiply(self.x, self._cos, out=xys[:, 0])
+        np.multiply(self.z, self._sin, out=self._scratch)
+        xys[:, 0] += self._scratch
+        xys[:, 1] = self.y
 
-# Do the rendering
-while not event.getKeys():
+        # z' = z cos a - x sin a
+        np.multiply(self.z, self._cos, out=self.depths)
+        np.multiply(self.x, self._sin, out=self._scratch)
+        self.depths -= self._scratch
 
-    # This is orthographic projection, so we get only the dots which are in front of the plane of the screen
-    behindCue = dotCoordsAll[2, :] >= 0
-    dotCoords = dotCoordsAll[:2, behindCue]
+        if self.viewing_distance is None:
+            # Orthographic: the half in front of the screen plane is visible
+            np.greater_equal(self.depths, 0, out=visible)
+        else:
+            # Perspective: scale by d / (d - z'); the surface facing the eye,
+            # where z' * d >= r^2, is visible
+            d = self.viewing_distance
+            np.subtract(d, self.depths, out=self._scratch)
+            np.divide(d, self._scratch, out=self._scratch)
+            xys *= self._scratch[:, None]
+            np.multiply(self.depths, d, out=self._scratch)
+            np.greater_equal(self._scratch, self._r_sq, out=visible)
+        self._depth_to_size(self.depths, sizes)
 
-    # Dot sizes for this frame
-    dotDepths = np.concatenate((dotCoordsAll[2, behindCue], minMaxDepth))
-    dotSizes = np.interp(dotDepths, (minMaxDepth[0], minMaxDepth[1]), (dotMinSizePixels, dotMaxSizePixels))
-    dotSizes = dotSizes[:-2]
+    def frame(self, frame_i):
+        """
+        Dot state for one frame, written into the preallocated buffers.
 
-    # Colors of the dots that we will display
-    theDotColors = dotColors[:, behindCue]
+        :param frame_i: Frame index (any non-negative integer).
+        :return: Tuple of (xys, sizes, visible): (n_dots x 2) screen positions,
+                 (n_dots,) sizes and (n_dots,) booleans, True for dots on the
+                 visible side of the sphere. The arrays are reused on the next call.
+        """
+        self._compute(frame_i, self.xys, self.sizes, self.visible)
+        return self.xys, self.sizes, self.visible
 
-    # Draw the dots
-    visual.ElementArrayStim(win, units='pix', nElements=len(dotSizes),
-                            xys=dotCoords.T, sizes=dotSizes,
-                            colors=theDotColors.T, elementMask='circle', elementTex=None).draw()
+    def precompute(self, n_frames, dtype=np.float32):
+        """
+        Dot state for a whole trial as one block, so the render loop only indexes.
 
-    # Flip to the screen
-    win.flip()
+        :param n_frames: Number of frames from frame 0.
+        :param dtype: Float type of the position and size blocks.
+        :return: Tuple of (xys, sizes, visible) with shapes (n_frames x n_dots x 2),
+                 (n_frames x n_dots) and (n_frames x n_dots).
+        """
+        xys = np.empty((n_frames, self.n_dots, 2), dtype=dtype)
+        sizes = np.empty((n_frames, self.n_dots), dtype=dtype)
+        visible = np.empty((n_frames, self.n_dots), dtype=bool)
+        for frame_i in range(n_frames):
+            self._compute(frame_i, self.xys, self.sizes, visible[frame_i])
+            xys[frame_i] = self.xys
+            sizes[frame_i] = self.sizes
+        return xys, sizes, visible
 
-    # Increment the angle and rotate the 3D coordinates
-    dotCoordsAll = np.dot(rotYmat, dotCoordsAll)
 
-# Close the window
-win.close()
-core.quit()
+def sphere_trial_frames(num_dots, radius, n_frames, deg_per_frame=0.3, dot_size_range=(4, 8),
+                        lifetime=None, coherence=1.0, viewing_distance=None, rng=None):
+    """
+    All frames of one rotating-sphere trial, e.g. as a trial_compiler build function.
+
+    :param num_dots: Number of dots.
+    :param radius: Sphere radius, which is also the depth of the largest dots.
+    :param n_frames: Number of frames.
+    :param deg_per_frame, dot_size_range, lifetime, coherence, viewing_distance:
+                     As for SphereTrajectory.
+    :param rng: np.random.Generator for the dot layout and the trajectory seed
+                (default: a fresh one).
+    :return: Tuple of (xys, sizes, visible) blocks as from SphereTrajectory.precompute.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    trajectory = SphereTrajectory(sphere_dot_coords(num_dots, radius, rng), deg_per_frame, radius,
+                                  dot_size_range, lifetime=lifetime, coherence=coherence,
+                                  viewing_distance=viewing_distance, seed=int(rng.integers(2**63)))
+    return trajectory.precompute(n_frames)
+
+
+if __name__ == "__main__":
+    from psychopy import visual, core, monitors
+    if __package__:
+        from .response_collector import ResponseCollector, keyboard_source
+    else:
+        from response_collector import ResponseCollector, keyboard_source
+
+    # Clear the workspace
+    # PsychoPy clears variables at the start, unlike MATLAB
+
+    # Random seed for the dot positions and colours, and for the trajectory's
+    # hash-based lifetimes, respawns and noise speeds (passed on as seed=). None
+    # gives a new stimulus every run, like np.random.seed() in the original; an
+    # integer reproduces a run exactly
+    seed = None
+    rng = np.random.default_rng(seed)
+
+    # Screen initialization
+    monitor = monitors.Monitor('testMonitor')  # Create a monitor profile (change 'testMonitor' as needed)
+    screenid = 0  # Assuming single screen setup, otherwise use max(screenids) equivalent
+
+    # Determine the values of black and white
+    black = [0, 0, 0]
+    white = [1, 1, 1]
+
+    # Set up our screen
+    win = visual.Window(color=black, fullscr=True, units='pix', monitor=monitor)
+
+    # Get the vertical refresh rate of the monitor
+    ifi = win.getMsPerFrame(nFrames=60, showVisual=False)[0] / 1000.0
+
+    # Get the width and height of the window in pixels
+    screenXpix, screenYpix = win.size
+
+    # Determine the center of the screen
+    center = [screenXpix / 2, screenYpix / 2]
+
+    # Get the physical dimensions of the monitor
+    widthMM, heightMM = monitor.getSizePix()
+    if widthMM is None or heightMM is None:
+        widthMM, heightMM = 520, 320  # Use default values if monitor size is not specified
+
+    # Convert to centimeters
+    screenYcm = heightMM / 10
+    screenXcm = widthMM / 10
+    pixPerCm = np.mean([screenXpix / screenXcm, screenYpix / screenYcm])
+
+    # Set the blend function so that we get nice antialiased edges to the dots defining our cylinder
+    win.setBlendMode('avg')
+
+    # Stimulus information
+    sphereRadius = 14  # Radius of the sphere in cm
+    maxDepthPix = sphereRadius * pixPerCm  # Maximum depth in pixels
+    sphereSurfArea = 4 * np.pi * sphereRadius**2  # Surface area of the sphere
+    dotDensity = 2
+    numDots = round(dotDensity * sphereSurfArea)  # Specify the number of dots we want on the sphere
+
+    # Uniformly distribute the points over the sphere, in pixels
+    dotCoordsAll = sphere_dot_coords(numDots, sphereRadius * pixPerCm, rng)
+
+    # Maximum and minimum depth possible
+    minMaxDepth = np.array([0, 1]) * sphereRadius * pixPerCm
+
+    # Set the dot size in pixels
+    dotMinSizePixels = 4
+    dotMaxSizePixels = 8
+
+    # Randomly color the dots
+    dotColors = rng.random((3, numDots)) * 2 - 1  # Scale colors from [0, 1] to [-1, 1]
+
+    # Update the stimulus on each frame
+    waitframes = 1
+
+    # Start angle and the angle in degrees that we will rotate per frame
+    angle = 0
+    degPerFrame = 0.3
+
+    # Dot lifetime in frames (None for infinite), fraction of dots rotating with the
+    # sphere, and viewing distance in pixels for perspective projection (None for orthographic)
+    dotLifetime = None
+    coherence = 1.0
+    viewingDistancePix = None
+
+    # Positions, visibility and sizes come straight from each frame's index
+    trajectory = SphereTrajectory(dotCoordsAll, degPerFrame, minMaxDepth[1],
+                                  (dotMinSizePixels, dotMaxSizePixels), start_angle=angle,
+                                  lifetime=dotLifetime, coherence=coherence,
+                                  viewing_distance=viewingDistancePix, seed=int(rng.integers(2**63)))
+
+    # One persistent dot field: the element count stays fixed and hidden dots are made transparent
+    dots = DotField(win, numDots, colors=dotColors.T, units='pix')
+
+    # Key presses are collected in the background, so the render loop only drains a queue
+    collector = ResponseCollector([keyboard_source()]).start()
+
+    # Do the rendering
+    frame = 0
+    while not collector.drain():
+
+        # Only the dots on the visible side of the sphere are shown
+        dotXys, dotSizes, frontCue = trajectory.frame(frame)
+
+        # Draw the dots
+        dots.update(dotXys, dotSizes, frontCue)
+        dots.draw()
+
+        # Flip to the screen
+        win.flip()
+
+        # Move on to the next frame's rotation angle
+        frame += waitframes
+
+    # Close the window
+    collector.stop()
+    win.close()
+    core.quit()
@@ -1,79 +1,100 @@
-from psychopy import visual, core, event
 import numpy as np
+if __package__:
+    from .frame_scheduler import FrameScheduler, compile_timeline, flash_events
+    from .response_collector import ResponseCollector, keyboard_source
+else:
+    from frame_scheduler import FrameScheduler, compile_timeline, flash_events
+    from response_collector import ResponseCollector, keyboard_source
 
-# Set up the window and some default settings
-# Clear the workspace
-# This part is implicit in Python as each run starts fresh, unlike MATLAB's workspace
 
-# Seed the random number generator for reproducibility
-np.random.seed()  # Equivalent to rng('shuffle')
+def flash_timeline(ifi, flash_rate=10, flash_duration=1.0):
+    """
+    Frames at which the flashing dot turns on or off.
 
-# Get screen information
-# PsychoPy automatically handles multiple screens, defaulting to the maximum screen if specified
-screen_width_pix = 1920  # Example value, replace with your screen's width
-screen_height_pix = 1080  # Example value, replace with your screen's height
+    :param ifi: Inter-frame interval in seconds, e.g. win.monitorFramePeriod.
+    :param flash_rate: Flashes per second.
+    :param flash_duration: Duration of the flashing in seconds.
+    :return: Timeline for FrameScheduler.run, with the dot as stimulus 0.
+    """
+    return compile_timeline(flash_events(flash_rate, flash_duration), ifi)
 
-# Define black and white
-white = [1, 1, 1]
-black = [-1, -1, -1]
 
-# Open a window and color it black
-win = visual.Window(size=(screen_width_pix, screen_height_pix), color=black, fullscr=True, units='pix')
+if __name__ == "__main__":
+    from psychopy import visual, core
 
-# Get the size of the on-screen window in pixels
-screenXpixels, screenYpixels = win.size
+    # Set up the window and some default settings
+    # Clear the workspace
+    # This part is implicit in Python as each run starts fresh, unlike MATLAB's workspace
 
-# Get the center coordinate of the window in pixels
-xCenter, yCenter = screenXpixels / 2, screenYpixels / 2
+    # Seed the random number generator for reproducibility
+    np.random.seed()  # Equivalent to rng('shuffle')
 
-# Enable alpha blending for anti-aliasing
-win.setBlendMode('avg')
+    # Get screen information
+    # PsychoPy automatically handles multiple screens, defaulting to the maximum screen if specified
+    screen_width_pix = 1920  # Example value, replace with your screen's width
+    screen_height_pix = 1080  # Example value, replace with your screen's height
 
-# Set the color of our dot to full red
-dotColor = [1, -1, -1]
+    # Define black and white
+    white = [1, 1, 1]
+    black = [-1, -1, -1]
 
-# Determine a random X and Y position for our dot
-dotXpos = np.random.rand() * screenXpixels
-dotYpos = np.random.rand() * screenYpixels
+    # Open a window and color it black
+    win = visual.Window(size=(screen_width_pix, screen_height_pix), color=black, fullscr=True, units='pix')
 
-# Dot size in pixels
-dotSizePix = 50
+    # Get the size of the on-screen window in pixels
+    screenXpixels, screenYpixels = win.size
 
-# Draw the dot to the screen
-dot = visual.Circle(win, radius=dotSizePix / 2, fillColor=dotColor, lineColor=dotColor, pos=(dotXpos - xCenter, dotYpos - yCenter))
-dot.draw()
+    # Get the center coordinate of the window in pixels
+    xCenter, yCenter = screenXpixels / 2, screenYpixels / 2
 
-# Flip to the screen
-win.flip()
+    # Enable alpha blending for anti-aliasing
+    win.setBlendMode('avg')
 
+    # Set the color of our dot to full red
+    dotColor = [1, -1, -1]
 
-# Create the text stimulus
-message = visual.TextStim(win, text='Press any key to continue', color=white, pos=(0, -screenYpixels / 2 + 50))
+    # Determine a random X and Y position for our dot
+    dotXpos = np.random.rand() * screenXpixels
+    dotYpos = np.random.rand() * screenYpixels
 
-# Draw the dot and the text message to the screen
-dot.draw()
-message.draw()
+    # Dot size in pixels
+    dotSizePix = 50
 
-# Flip to the screen
-win.flip()
+    # Draw the dot to the screen
+    dot = visual.Circle(win, radius=dotSizePix / 2, fillColor=dotColor, lineColor=dotColor, pos=(dotXpos - xCenter, dotYpos - yCenter))
+    dot.draw()
+
+    # Flip to the screen
+    win.flip()
 
-# Wait for a keyboard button press to continue
-event.waitKeys()
 
-# Flash the dot at 10 Hz for 1 second
-flash_duration = 1.0  # duration in seconds
-flash_rate = 10  # frequency in Hz
-num_flashes = int(flash_duration * flash_rate)
-flash_interval = 1.0 / flash_rate
+    # Create the text stimulus
+    message = visual.TextStim(win, text='Press any key to continue', color=white, pos=(0, -screenYpixels / 2 + 50))
 
-# Perform the flashing
-for _ in range(num_flashes):
+    # Draw the dot and the text message to the screen
     dot.draw()
+    message.draw()
+
+    # Flip to the screen
     win.flip()
-    core.wait(flash_interval / 2)
-    win.flip()
-    core.wait(flash_interval / 2)
 
-# Close the window and exit
-win.close()
-core.quit()
\ No newline at end of file
+    # Wait for a keyboard button press to continue; keys are collected in the background
+    collector = ResponseCollector([keyboard_source()]).start()
+    collector.wait()
+
+    # Flash the dot at 10 Hz for 1 second
+    flash_duration = 1.0  # duration in seconds
+    flash_rate = 10  # frequency in Hz
+
+    # Convert the flashes to frames once, then flip only when the dot turns on or off,
+    # each flip timed to land on its refresh
+    ifi = win.monitorFramePeriod
+    timeline = flash_timeline(ifi, flash_rate, flash_duration)
+    scheduler = FrameScheduler(ifi)
+    flip_times, missed = scheduler.run(win, timeline, [dot], check_abort=lambda: bool(collector.drain(["escape"])))
+    print(f"{len(flip_times)} flips, {int(np.sum(missed > 0))} late")
+
+    # Close the window and exit
+    collector.stop()
+    win.close()
+    core.quit()
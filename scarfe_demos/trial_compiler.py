@@ -0,0 +1,125 @@
+import inspect
+import time
+import traceback
+from collections import namedtuple
+import numpy as np
+if __package__:
+    from .frame_scheduler import compile_timeline
+else:
+    from frame_scheduler import compile_timeline
+
+# Pre-session trial compilation. Every trial's stimulus is built by a worker
+# process and every trial's timeline is converted to frames before the window
+# opens, so the trial loop only fetches prepared arrays. All trials are attempted
+# and all failures are reported together, before anyone sits down at the display.
+
+CompiledTrial = namedtuple('CompiledTrial', ['params', 'stimulus', 'timeline', 'compile_time'])
+
+
+class TrialCompileError(Exception):
+    def __init__(self, failures):
+        """
+        :param failures: List of (trial_index, params, traceback_text) for every
+                         trial that failed.
+        """
+        self.failures = failures
+        lines = [f"{len(failures)} trial(s) failed to compile:"]
+        for trial_i, params, tb in failures:
+            lines.append(f"  trial {trial_i} {params}: {tb.strip().splitlines()[-1]}")
+        super().__init__("\n".join(lines))
+
+
+def _build_trial(build, params, seed_seq):
+    start = time.perf_counter()
+    try:
+        if seed_seq is not None:
+            params = dict(params, rng=np.random.default_rng(seed_seq))
+        stimulus = build(**params)
+    except Exception:
+        return False, traceback.format_exc(), time.perf_counter() - start
+    return True, stimulus, time.perf_counter() - start
+
+
+def compile_trials(trials, build, ifi=None, processes=None, seed=None, verbose=False):
+    """
+    Build the stimulus and timeline of every trial ahead of the session.
+
+    :param trials: Sequence of dicts of keyword arguments for build. A trial may also
+                   hold 'events', (stim_index, on, off) rows in seconds, which are
+                   compiled into its timeline instead of being passed to build.
+    :param build: Module-level function (so worker processes can import it) that
+                  returns one trial's stimulus, e.g. sfm_sphere.sphere_trial_frames
+                  or ouchi.generate_checker_pattern_with_patch.
+    :param ifi: Inter-frame interval in seconds; needed if any trial has events.
+    :param processes: Number of worker processes (default: one per CPU; 0 builds in
+                      this process).
+    :param seed: If given, build must take an rng argument, and each trial gets its own
+                 np.random.Generator spawned from this seed, so the stimuli are the
+                 same however the trials are spread over the workers.
+    :param verbose: Print the compile time of the session.
+    :return: List of CompiledTrial(params, stimulus, timeline, compile_time) in trial
+             order; timeline is None for trials without events.
+    :raises TrialCompileError: After all trials were attempted, if any failed.
+    """
+    trials = [dict(trial) for trial in trials]
+    events = [trial.pop('events', None) for trial in trials]
+    if seed is None:
+        seed_seqs = [None] * len(trials)
+    elif 'rng' not in inspect.signature(build).parameters:
+        raise ValueError(f"seed was given but {build.__name__} does not take an rng argument.")
+    else:
+        seed_seqs = np.random.SeedSequence(seed).spawn(len(trials))
+
+    start = time.perf_counter()
+    if processes == 0:
+        results = [_build_trial(build, params, s) for params, s in zip(trials, seed_seqs)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_build_trial, [build] * len(trials), trials, seed_seqs))
+
+    compiled, failures = [], []
+    for trial_i, (params, trial_events, (ok, result, elapsed)) in enumerate(zip(trials, events, results)):
+        if not ok:
+            failures.append((trial_i, params, result))
+            continue
+        timeline = None
+        if trial_events is not None:
+            try:
+                if ifi is None:
+                    raise ValueError("ifi is needed to compile trial events.")
+                timeline = compile_timeline(trial_events, ifi)
+            except Exception:
+                failures.append((trial_i, params, traceback.format_exc()))
+                continue
+        compiled.append(CompiledTrial(params, result, timeline, elapsed))
+    if failures:
+        raise TrialCompileError(failures)
+
+    if verbose:
+        print(f"Compiled {len(compiled)} trials in {time.perf_counter() - start:.2f} s "
+              f"({sum(trial.compile_time for trial in compiled):.2f} s of build time)")
+    return compiled
+
+
+if __name__ == "__main__":
+    if __package__:
+        from .sfm_sphere import sphere_trial_frames
+    else:
+        from sfm_sphere import sphere_trial_frames
+
+    # Twenty 2 s sphere trials at 60 Hz, crossing coherence with lifetime, each
+    # shown from 0.5 s to 2 s of its timeline
+    ifi = 1 / 60
+    trials = [dict(num_dots=2000, radius=300, n_frames=120, coherence=coherence, lifetime=lifetime,
+                   events=[(0, 0.5, 2.0)])
+              for coherence in (0.25, 0.5, 0.75, 1.0) for lifetime in (None, 10, 20, 40, 80)]
+    compiled = compile_trials(trials, sphere_trial_frames, ifi=ifi, seed=1, verbose=True)
+    nbytes = sum(sum(block.nbytes for block in trial.stimulus) for trial in compiled)
+    print(f"{nbytes / 1e6:.0f} MB of frames, first timeline flips at frames {compiled[0].timeline.frames}")
+
+    # A bad trial is reported with the others, not halfway through a session
+    try:
+        compile_trials(trials[:2] + [dict(num_dots=-1, radius=300, n_frames=120)], sphere_trial_frames, ifi=ifi)
+    except TrialCompileError as e:
+        print(e)
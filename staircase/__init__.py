@@ -0,0 +1,3 @@
+# Adaptive staircases (staircase) and batch psychometric and equivalent-noise
+# fits (batch_fit). Import the submodule you need; nothing is imported here so
+# workers start quickly.
@@ -1,7 +1,10 @@
 import numpy as np
 import csv
 import random
-from staircase import Staircase
+if __package__:
+    from .staircase import Staircase
+else:
+    from staircase import Staircase
 
 def do_sim(sim_noise_std_dev, lin_stim_level):
     """
@@ -54,5 +57,6 @@ def demo_1_minimal_example():
 
     print(f'Output saved in: {csv_file_name}')
 
-# Run the demo
-demo_1_minimal_example()
\ No newline at end of file
+if __name__ == "__main__":
+    # Run the demo
+    demo_1_minimal_example()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from staircase.batch_fit import (equivalent_noise, fit_equivalent_noise, fit_line, fit_psychometric,
+                                 fit_psychometric_tables, psychometric, threshold)
+
+optimize = pytest.importorskip('scipy.optimize')
+
+
+def simulated_tables(n_sets, kind, seed=0):
+    rng = np.random.default_rng(seed)
+    tables = []
+    for _ in range(n_sets):
+        if kind == 'weibull':
+            mu, sigma = rng.uniform(1, 3), rng.uniform(1.5, 4)
+            levels = np.linspace(0.3 * mu, 2 * mu, rng.integers(5, 9))
+        else:
+            mu, sigma = rng.uniform(1, 3), rng.uniform(0.3, 1.0)
+            levels = np.linspace(mu - 2, mu + 2, rng.integers(5, 9))
+        n = np.full(len(levels), 40)
+        tables.append(np.array([levels, n, rng.binomial(n, psychometric(levels, mu, sigma, kind))], dtype=float))
+    return tables
+
+
+def neg_log_likelihood(params, table, kind):
+    levels, n, k = table
+    p = np.clip(psychometric(levels, params[0], params[1], kind), 1e-12, 1 - 1e-12)
+    return -np.sum(k * np.log(p) + (n - k) * np.log(1 - p))
+
+
+@pytest.mark.parametrize('kind', ['norm', 'logistic', 'weibull'])
+def test_psychometric_matches_scipy(kind):
+    tables = simulated_tables(6, kind)
+    fit = fit_psychometric_tables(tables, kind)
+    assert fit.converged.all()
+    for i, table in enumerate(tables):
+        reference = optimize.minimize(neg_log_likelihood, [fit.mu[i] * 1.1, fit.sigma[i] * 0.9],
+                                      args=(table, kind), method='Nelder-Mead',
+                                      options={'xatol': 1e-9, 'fatol': 1e-12, 'maxiter': 5000})
+        assert neg_log_likelihood([fit.mu[i], fit.sigma[i]], table, kind) <= reference.fun + 1e-7
+        np.testing.assert_allclose([fit.mu[i], fit.sigma[i]], reference.x, rtol=1e-3)
+
+
+def test_tables_match_padded_batch():
+    tables = simulated_tables(5, 'norm')
+    width = max(table.shape[1] for table in tables)
+    padded = np.zeros((3, len(tables), width))
+    for i, table in enumerate(tables):
+        padded[:, i, :table.shape[1]] = table
+        padded[0, i, table.shape[1]:] = table[0, -1]
+    batch = fit_psychometric(*padded)
+    by_table = fit_psychometric_tables(tables, chunk_size=2)
+    np.testing.assert_allclose(by_table.mu, batch.mu, rtol=1e-6)
+    np.testing.assert_allclose(by_table.sigma, batch.sigma, rtol=1e-6)
+
+
+@pytest.mark.parametrize('kind', ['norm', 'logistic', 'weibull'])
+def test_threshold_inverts_psychometric(kind):
+    levels = threshold(np.array([0.6, 0.75, 0.9]), 2.0, 1.5, kind)
+    np.testing.assert_allclose(psychometric(levels, 2.0, 1.5, kind), [0.6, 0.75, 0.9])
+
+
+def test_fit_line_matches_polyfit():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 10, (4, 12))
+    y = 2 * x - 1 + rng.normal(0, 1, x.shape)
+    w = rng.uniform(0.5, 2, x.shape)
+    x[0, 9:] = np.nan
+    m, b = fit_line(x, y, w)
+    for i in range(len(x)):
+        valid = np.isfinite(x[i])
+        np.testing.assert_allclose([m[i], b[i]], np.polyfit(x[i, valid], y[i, valid], 1, w=np.sqrt(w[i, valid])))
+    m0, _ = fit_line(x, y, through_origin=True)
+    valid = np.isfinite(x[1])
+    np.testing.assert_allclose(m0[1], np.linalg.lstsq(x[1, valid, None], y[1, valid], rcond=None)[0][0])
+
+
+def test_equivalent_noise_matches_scipy():
+    rng = np.random.default_rng(2)
+    noise = np.tile(np.logspace(-2, 0, 8), (4, 1))
+    k, n_eq = rng.uniform(0.2, 0.8, 4), rng.uniform(0.02, 0.2, 4)
+    y = equivalent_noise(noise, k[:, None], n_eq[:, None]) * (1 + 0.05 * rng.standard_normal(noise.shape))
+    fit = fit_equivalent_noise(noise, y)
+    assert fit.converged.all()
+    for i in range(len(noise)):
+        reference = optimize.least_squares(lambda p: equivalent_noise(noise[i], p[0], p[1]) - y[i],
+                                           [k[i], n_eq[i]], bounds=([1e-6, 0], np.inf), xtol=1e-14, ftol=1e-14)
+        np.testing.assert_allclose([fit.k[i], fit.n_eq[i]], reference.x, rtol=1e-4)
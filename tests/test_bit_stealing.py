@@ -0,0 +1,52 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from calibration.bit_stealing import BitStealingTable
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def assert_nearest(table, lums):
+    # Same distance as the brute-force nearest entry (ties may pick either side)
+    index = table.index(lums)
+    brute = np.abs(lums[..., None] - table.lum).min(axis=-1)
+    np.testing.assert_array_equal(np.abs(lums - table.lum[index]), brute)
+
+
+def random_table(rng, n=500):
+    rgb = rng.integers(0, 256, (n, 3))
+    # Clustered luminances with duplicates, so some buckets hold many edges
+    lum = np.concatenate([rng.uniform(0, 1, n // 2), rng.uniform(0.4, 0.41, n - n // 2 - 10), np.full(10, 0.5)])
+    return np.column_stack([rgb, rng.permutation(lum)])
+
+
+@pytest.mark.parametrize('max_buckets', [1024, 2**20])
+def test_index_matches_brute_force(max_buckets):
+    rng = np.random.default_rng(0)
+    table = BitStealingTable(random_table(rng), max_buckets=max_buckets)
+    lums = np.concatenate([rng.uniform(-0.1, 1.1, 5000), table.lum, rng.uniform(0.4, 0.41, 1000)])
+    assert_nearest(table, lums.reshape(10, -1))
+
+
+def test_sample_table(tmp_path):
+    # A copy, so the sidecar cache is not written into the repository
+    path = shutil.copy(os.path.join(REPO_ROOT, 'sample.ddf'), tmp_path)
+    table = BitStealingTable.from_file(path)
+    lums = np.random.default_rng(1).uniform(table.lum_min - 1, table.lum_max + 1, (64, 64))
+    assert_nearest(table, lums)
+
+    rgb = table.lookup(lums)
+    np.testing.assert_array_equal(rgb, table.rgb[table.index(lums)])
+    np.testing.assert_allclose(table.lookup(lums, space='rgb'), rgb / 127.5 - 1, atol=1e-6)
+
+
+def test_rgb_to_index():
+    rng = np.random.default_rng(2)
+    table = BitStealingTable(random_table(rng, 200))
+    exact = table.rgb[[0, 50, 199]]
+    np.testing.assert_array_equal(table.rgb[table.rgb_to_index(exact)], exact)
+    query = rng.integers(0, 256, (30, 3))
+    distance = np.abs(query[:, None, :] - table.rgb.astype(int)).sum(axis=-1)
+    chosen = np.abs(query - table.rgb[table.rgb_to_index(query)].astype(int)).sum(axis=-1)
+    np.testing.assert_array_equal(chosen, distance.min(axis=1))
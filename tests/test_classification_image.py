@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from noise_detect_discrim.classification_image import (YES_NO_CLASSES, ClassificationImage, power_spectrum,
+                                                       yes_no_class)
+
+SHAPE = (16, 12)
+
+
+@pytest.fixture
+def trials():
+    rng = np.random.default_rng(0)
+    noises = rng.normal(0, 1, (300,) + SHAPE)
+    classes = yes_no_class(rng.random(300) < 0.5, rng.random(300) < 0.5)
+    return noises, classes
+
+
+def one_by_one(noises, classes):
+    acc = ClassificationImage(SHAPE, spectral=True)
+    for noise, cls in zip(noises, classes):
+        acc.add(noise, cls)
+    return acc
+
+
+def assert_same_statistics(a, b):
+    np.testing.assert_array_equal(a.counts, b.counts)
+    for domain in ('space', 'power'):
+        for c in range(len(YES_NO_CLASSES)):
+            np.testing.assert_allclose(a.mean(c, domain), b.mean(c, domain), rtol=1e-10, atol=1e-12)
+            np.testing.assert_allclose(a.variance(c, domain), b.variance(c, domain), rtol=1e-10, atol=1e-12)
+
+
+def test_add_matches_direct_statistics(trials):
+    noises, classes = trials
+    acc = one_by_one(noises, classes)
+    power = power_spectrum(noises)
+    for c, name in enumerate(YES_NO_CLASSES):
+        members = classes == c
+        assert acc.count(name) == members.sum()
+        np.testing.assert_allclose(acc.mean(name), noises[members].mean(axis=0), atol=1e-12)
+        np.testing.assert_allclose(acc.variance(name), noises[members].var(axis=0, ddof=1), rtol=1e-10)
+        np.testing.assert_allclose(acc.mean(name, 'power'), power[members].mean(axis=0), rtol=1e-10)
+
+
+def test_add_batch_matches_add(trials):
+    noises, classes = trials
+    batched = ClassificationImage(SHAPE, spectral=True)
+    for start in range(0, len(noises), 64):
+        batched.add_batch(noises[start:start + 64], classes[start:start + 64])
+    assert_same_statistics(batched, one_by_one(noises, classes))
+
+
+def test_batch_accepts_class_names(trials):
+    noises, classes = trials
+    by_index, by_name = ClassificationImage(SHAPE), ClassificationImage(SHAPE)
+    by_index.add_batch(noises, classes)
+    by_name.add_batch(noises, [YES_NO_CLASSES[c] for c in classes])
+    np.testing.assert_array_equal(by_name.image()[0], by_index.image()[0])
+
+
+def test_merge_matches_add(trials):
+    noises, classes = trials
+    first, second = one_by_one(noises[:100], classes[:100]), ClassificationImage(SHAPE, spectral=True)
+    second.add_batch(noises[100:], classes[100:])
+    first.merge(second)
+    assert_same_statistics(first, one_by_one(noises, classes))
+
+
+def test_merge_rejects_other_shapes():
+    with pytest.raises(ValueError):
+        ClassificationImage(SHAPE).merge(ClassificationImage((8, 8)))
+
+
+def test_save_and_load(tmp_path, trials):
+    noises, classes = trials
+    acc = one_by_one(noises, classes)
+    acc.save(str(tmp_path / 'ci.npz'))
+    assert_same_statistics(ClassificationImage.load(str(tmp_path / 'ci.npz')), acc)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scarfe_demos.frame_scheduler import FrameScheduler, compile_timeline, flash_events
+from scarfe_demos.frame_timer import FakeClock
+
+
+class CountingStim:
+    def __init__(self):
+        self.n_draws = 0
+
+    def draw(self):
+        self.n_draws += 1
+
+
+def test_flash_timeline_frames():
+    timeline = compile_timeline(flash_events(10, 1.0), 1 / 60)
+    assert timeline.n_frames == 57
+    np.testing.assert_array_equal(timeline.frames, np.arange(0, 58, 3))
+    np.testing.assert_array_equal(timeline.states[:, 0], np.arange(20) % 2 == 0)
+
+
+def test_back_to_back_events_need_no_flip():
+    timeline = compile_timeline([(0, 0, 10), (0, 10, 20), (1, 5, 15)], 1 / 60, units='frames')
+    np.testing.assert_array_equal(timeline.frames, [0, 5, 15, 20])
+    np.testing.assert_array_equal(timeline.states, [[1, 0], [1, 1], [1, 0], [0, 0]])
+
+
+def test_events_must_be_ordered():
+    with pytest.raises(ValueError):
+        compile_timeline([(0, 10, 5)], 1 / 60, units='frames')
+
+
+def test_flips_land_on_their_deadlines():
+    clock = FakeClock(1 / 144, drop_frames=(5,))
+    timeline = compile_timeline(np.concatenate([flash_events(10, 1.0, stim_index=0),
+                                                flash_events(4, 1.0, stim_index=1)]), clock.ifi)
+    stims = [CountingStim(), CountingStim()]
+    scheduler = FrameScheduler(clock.ifi, get_time=clock.getTime, sleep=clock.advance, spin_margin=0)
+    flip_times, missed = scheduler.run(clock, timeline, stims)
+
+    # FakeClock flip 5 is the fifth timeline change, after the starting flip
+    np.testing.assert_array_equal(np.flatnonzero(missed), [4])
+    assert missed[4] == 1
+    # Frame 0 is the refresh after the starting flip, which lands at ifi; a late
+    # flip does not push back the ones after it
+    on_time = missed == 0
+    np.testing.assert_allclose(flip_times[on_time], clock.ifi * (timeline.frames[on_time] + 2))
+    assert [stim.n_draws for stim in stims] == timeline.states.sum(axis=0).tolist()
+
+
+def test_check_abort_stops_the_run():
+    clock = FakeClock(1 / 60)
+    timeline = compile_timeline(flash_events(10, 1.0), clock.ifi)
+    scheduler = FrameScheduler(clock.ifi, get_time=clock.getTime, sleep=clock.advance, spin_margin=0)
+    flip_times, _ = scheduler.run(clock, timeline, [CountingStim()], check_abort=lambda: clock.n_flips > 3)
+    assert np.count_nonzero(~np.isnan(flip_times)) == 3
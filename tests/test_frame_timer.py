@@ -0,0 +1,47 @@
+import numpy as np
+from scarfe_demos.frame_timer import FakeClock, FrameTimer
+
+
+def run_frames(timer, clock, n_frames):
+    for _ in range(n_frames):
+        timer.begin_draw()
+        clock.advance()
+        timer.flip(clock)
+
+
+def test_detects_dropped_frames():
+    clock = FakeClock(1 / 60, drop_frames=(100, 250, 251), draw_time=0.004)
+    drops = []
+    timer = FrameTimer(clock.ifi, get_time=clock.getTime, on_drop=lambda frame, n: drops.append((frame, n)))
+    run_frames(timer, clock, 600)
+
+    assert drops == [(100, 1), (250, 1), (251, 1)]
+    summary = timer.summary()
+    assert summary['n_frames'] == 600
+    assert summary['n_dropped'] == 3
+    assert summary['n_late'] == 3
+    np.testing.assert_array_equal(np.flatnonzero(timer.missed[:600]), [100, 250, 251])
+    np.testing.assert_allclose(timer.draw_durations[:600], 0.004)
+
+
+def test_on_time_flips_have_no_deviation():
+    clock = FakeClock(1 / 144)
+    timer = FrameTimer(clock.ifi, get_time=clock.getTime)
+    run_frames(timer, clock, 200)
+
+    assert timer.n_dropped == 0
+    np.testing.assert_allclose(timer.intervals(), clock.ifi)
+    assert abs(timer.summary()['mean_deviation_ms']) < 1e-9
+
+
+def test_ring_buffer_keeps_latest_frames():
+    clock = FakeClock(1 / 60, drop_frames=(95,))
+    timer = FrameTimer(clock.ifi, capacity=32, get_time=clock.getTime)
+    run_frames(timer, clock, 100)
+
+    assert timer.n_frames == 100
+    assert timer.n_dropped == 1
+    assert len(timer.intervals()) == 31
+    # The retained intervals are the last 31, in order, with the drop fifth from the end
+    np.testing.assert_allclose(timer.intervals()[-5], 2 * clock.ifi)
+    assert np.all(timer.intervals() > 0)
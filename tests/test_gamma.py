@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from calibration.gamma import pelli_fit, pelli_power
+
+VALUES = np.arange(0, 256, 15, dtype=float)
+COEFFS = np.array([[0.05, 0.02, 0.015, 2.2],
+                   [0.10, 0.01, 0.020, 2.4],
+                   [0.15, 0.03, 0.010, 2.0]])
+
+
+def pellifit_error(coeffs, values, lums):
+    # errfn of pellifit.m: squared errors divided by 1 / (0.1 * lum)
+    return np.sum((pelli_power(coeffs, values) - lums) ** 2 / (1 / (lums * 0.1)))
+
+
+def test_recovers_known_parameters():
+    lums = pelli_power(COEFFS, VALUES)
+    fitted = pelli_fit(VALUES, lums)
+    assert fitted.shape == (3, 4)
+    np.testing.assert_allclose(pelli_power(fitted, VALUES), lums, rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(fitted, COEFFS, rtol=1e-4)
+
+
+def test_single_gun_matches_batch():
+    lums = pelli_power(COEFFS, VALUES)
+    np.testing.assert_allclose(pelli_fit(VALUES, lums[1]), pelli_fit(VALUES, lums)[1], rtol=1e-8)
+
+
+def test_minimizes_pellifit_objective():
+    # pellifit.m minimizes its errfn with fmins (Nelder-Mead) from [min(lum), 0.01, 0.01, 2]
+    optimize = pytest.importorskip('scipy.optimize')
+    rng = np.random.default_rng(0)
+    lums = pelli_power(COEFFS[0], VALUES) * rng.normal(1, 0.03, len(VALUES))
+    fitted = pelli_fit(VALUES, lums)
+    reference = optimize.minimize(pellifit_error, [lums.min(), 0.01, 0.01, 2], args=(VALUES, lums),
+                                  method='Nelder-Mead', options={'xatol': 1e-10, 'fatol': 1e-14, 'maxiter': 20000})
+    assert pellifit_error(fitted, VALUES, lums) <= reference.fun * (1 + 1e-6)
+    np.testing.assert_allclose(pelli_power(fitted, VALUES), pelli_power(reference.x, VALUES), rtol=1e-3)
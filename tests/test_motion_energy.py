@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from motion_energy_model.energy_observer import EnergyObserver
+from motion_energy_model.motion_energy_model import convolve_filters, filter_responses, motion_energy, oriented_filters
+
+pytest.importorskip('scipy.signal')
+
+# 5 ms and 0.05 deg samples, as the default filters
+T = np.arange(120)[:, None] * 0.005
+X = np.arange(100)[None, :] * 0.05
+
+
+def grating(contrast=1.0, speed=4.0):
+    return contrast * np.sin(2 * np.pi * (1.1 * X - speed * T))
+
+
+@pytest.mark.parametrize('params', [{}, dict(nx=40, nt=60, sf=2.0, slow_n=7)])
+def test_separable_matches_full_2d(params):
+    stim = (np.random.default_rng(0).random((160, 120)) < 0.5).astype(float)
+    responses = filter_responses(stim, **params)
+    for name, filt in oriented_filters(**params).items():
+        expected = convolve_filters(stim, filt) ** 2
+        np.testing.assert_allclose(responses[name], expected, rtol=1e-9, atol=1e-9 * np.abs(expected).max())
+
+
+def test_direction_sign():
+    assert motion_energy(grating(speed=4.0))[0] > 0
+    assert motion_energy(grating(speed=-4.0))[0] < 0
+    # Normalized energy does not depend on contrast
+    np.testing.assert_allclose(motion_energy(grating(0.1))[0], motion_energy(grating(1.0))[0])
+
+
+def test_observer_caches_levels():
+    calls = []
+
+    def make_stimulus(level):
+        calls.append(level)
+        return grating(10 ** (level / 20))
+
+    observer = EnergyObserver([-20.0, -10.0], make_stimulus, decision_noise=0.0, rng=np.random.default_rng(0))
+    assert observer.is_correct(-20.0) and observer.is_correct(-5.0) and observer.is_correct(-5.0)
+    assert calls == [-20.0, -10.0, -5.0]
+
+
+def test_packaged_stimuli_load_from_any_directory(tmp_path, monkeypatch):
+    from motion_energy_model.motion_energy_model import load_stimulus
+
+    monkeypatch.chdir(tmp_path)
+    for name in ('AB15.mat', 'AB16.mat'):
+        stim = load_stimulus(name)
+        assert stim.ndim == 2
+        assert np.isfinite(motion_energy(stim)[0])
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from ouchi_parameterized.ouchi import (Patch, generate_checker_pattern_with_patch, ouchi_labels, ouchi_tiles,
+                                       tiles_to_image, tiles_to_labels)
+
+CASES = [
+    dict(size=256, num_strips=20, orientation=0, patches=[Patch(50, 90)]),
+    dict(size=512, num_strips=128, orientation=45, patches=[Patch(100, -60)]),
+    dict(size=300, num_strips=37, orientation=17.5, patches=[Patch(40, 90, (-60, 30)), Patch(25, 0, (50, -40))],
+         background='square'),
+    dict(size=128, num_strips=16, orientation=90, patches=[], cycles_per_strip=8),
+]
+
+
+@pytest.mark.parametrize('params', CASES)
+def test_tiles_rebuild_the_label_map(params):
+    np.testing.assert_array_equal(tiles_to_labels(ouchi_tiles(**params)), ouchi_labels(**params))
+
+
+def test_tiles_are_smaller_than_the_image():
+    tiles = generate_checker_pattern_with_patch(num_strips=128, size=1024, orientation=45, as_tiles=True)
+    image = generate_checker_pattern_with_patch(num_strips=128, size=1024, orientation=45)
+    np.testing.assert_array_equal(tiles_to_image(tiles), image)
+    assert tiles.nbytes < image.nbytes / 50
+
+
+def test_rgb_frames_share_the_cache_encoding():
+    from ouchi_parameterized.ouchi import apply_colors, color_lut
+    from ouchi_parameterized.ouchi_animation import animate_ouchi, frames_to_rgb, jitter_offsets
+    from ouchi_parameterized.ouchi_cache import decode_image
+
+    frames = animate_ouchi(jitter_offsets(4, 2, np.random.default_rng(0)), size=64, num_strips=16,
+                           orientation=45, patches=[Patch(16, -60)])
+    lut = color_lut([([-0.5] * 3, [0.5] * 3), ([-1] * 3, [0] * 3)])
+    rgb = frames_to_rgb(frames, lut)
+    assert rgb.dtype == np.uint8
+    expected = apply_colors(frames, lut)
+    np.testing.assert_allclose(decode_image(rgb), expected, atol=0.5 / 127 + 1e-7)
+    # Uncovered pixels and the patch's 0 are mid-grey, stored as 127 like the cache does
+    assert np.all(rgb[expected == 0] == 127)
+
+
+def old_square_background(num_strips=20, size=512, color1=[-1, -1, -1], color2=[1, 1, 1], orientation=0,
+                          patch_radius=100, patch_orientation=90, patch_color1=[-1, -1, -1], patch_color2=[1, 1, 1]):
+    # generate_checker_pattern_with_patch of the former ouchi_square_background.py
+    def strips(c1, c2):
+        arr = np.zeros((size, size, 3), dtype=float)
+        strip_width = size // num_strips
+        cycles_per_strip = 16
+        segment_height = size // (cycles_per_strip * 2)
+        for strip_i in range(num_strips):
+            for x in range(strip_i * strip_width, min((strip_i + 1) * strip_width, size)):
+                for cycle_i in range(cycles_per_strip * 2):
+                    first = (cycle_i % 2 == 0) == (strip_i % 2 == 0)
+                    arr[cycle_i * segment_height:min((cycle_i + 1) * segment_height, size), x, :] = c1 if first else c2
+        return arr
+
+    image_arr = strips(color1, color2)
+    if orientation != 0:
+        image_arr = np.rot90(image_arr, k=int((orientation % 360) / 90))
+    yy, xx = np.meshgrid(range(size), range(size))
+    circular_mask = (xx - size // 2)**2 + (yy - size // 2)**2 <= patch_radius**2
+    patch_arr = strips(patch_color1, patch_color2)
+    if patch_orientation != 0:
+        patch_arr = np.rot90(patch_arr, k=int((patch_orientation % 360) / 90))
+    return np.where(circular_mask[..., None], patch_arr, image_arr)
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    dict(num_strips=100, color1=[-0.5] * 3, color2=[0.5] * 3),
+    dict(orientation=45, patch_orientation=-30),
+    dict(size=256, num_strips=16, orientation=180, patch_orientation=270, patch_radius=40),
+])
+def test_square_background_matches_old_script(params):
+    np.testing.assert_array_equal(generate_checker_pattern_with_patch(background='square', **params),
+                                  old_square_background(**params))
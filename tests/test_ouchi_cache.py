@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from ouchi_parameterized.ouchi import generate_checker_pattern_with_patch
+from ouchi_parameterized.ouchi_cache import OuchiCache, decode_image, encode_image
+
+
+def test_uint8_round_trip_keeps_zero_and_extremes():
+    image = np.array([-1.0, 0.0, 1.0])
+    np.testing.assert_array_equal(decode_image(encode_image(image, 'uint8')), image)
+
+
+@pytest.mark.parametrize('dtype', ['uint8', 'float16'])
+def test_rows_with_extra_columns(tmp_path, dtype):
+    cache = OuchiCache(str(tmp_path), dtype)
+    row = dict(num_strips=32, size=64, patch_radius=16, orientation=45, corrAns='left')
+    keys = cache.compile([row, dict(row, corrAns='right')], processes=0)
+    assert keys[0] == keys[1] == cache.key(dict(num_strips=32, size=64, patch_radius=16, orientation=45))
+    assert row in cache
+    image = cache.load(row, decode=True)
+    expected = generate_checker_pattern_with_patch(num_strips=32, size=64, patch_radius=16, orientation=45)
+    np.testing.assert_allclose(image, expected, atol=1 / 127 if dtype == 'uint8' else 1e-3)
+    with pytest.raises(KeyError):
+        cache.load(dict(row, orientation=0))
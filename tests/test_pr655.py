@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from calibration.pr655 import NATIVE_WAVELENGTHS, ReplayPR655, format_spd_response, write_recording
+
+
+def test_no_sync_warns_and_remeasures(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    spd = np.ones(len(NATIVE_WAVELENGTHS))
+    write_recording(path, [format_spd_response(spd, quality=-8), format_spd_response(spd)])
+    meter = ReplayPR655(path, timing=False)
+    with pytest.warns(UserWarning, match='sync'):
+        _, quality = meter.measure()
+    assert quality == 0
+    assert meter.commands == ['SS0']
+
+
+def test_low_light_reads_zero(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    write_recording(path, [format_spd_response(np.ones(len(NATIVE_WAVELENGTHS)), quality=-1)])
+    spd, quality = ReplayPR655(path, timing=False).measure()
+    assert quality == -1
+    assert not spd.any()
+
+
+def test_incomplete_meter_fails_on_construction():
+    from calibration.pr655 import _Meter
+
+    class WriteOnly(_Meter):
+        def write(self, command):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnly()
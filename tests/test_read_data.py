@@ -0,0 +1,79 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from calibration import read_data as rd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_sample(name):
+    with open(os.path.join(REPO_ROOT, name), 'rb') as f:
+        return rd.parse_data_file(f.read().decode('latin-1'))
+
+
+@pytest.fixture
+def ddf_copy(tmp_path):
+    # read_data writes its sidecar next to the file, so never point it at the repo
+    return shutil.copy(os.path.join(REPO_ROOT, 'sample.ddf'), tmp_path)
+
+
+def test_parse_sample_ddf():
+    ddf = read_sample('sample.ddf')
+    assert ddf.data.shape == (1779, 4)
+    np.testing.assert_array_equal(ddf.data[0], [1, 1, 1, 0.0937203])
+    assert ddf.variables['Date'] == '9/2/1998'
+    assert ddf.variables['Time'] == '10:57:9'
+    np.testing.assert_array_equal(ddf.variables['rcoeffs'], [0.023151, 0.0072494, 0.015106, 2.1557])
+    np.testing.assert_array_equal(ddf.variables['coeffs'], [0.017596, 0.016547, 0.0036516, 2.3296])
+    assert [ddf.variables[name] for name in ('r', 'g', 'b', 'lum')] == [1, 2, 3, 4]
+    assert ddf.comments[0] == 'L(v)/cdm^2 = a + (b + kv)^g  {if b + kv >= 0}'
+    np.testing.assert_array_equal(ddf.column('lum'), ddf.data[:, 3])
+
+
+def test_parse_sample_params():
+    params = read_sample('sample.params')
+    np.testing.assert_array_equal(params.data, [[1, 0.1, 0.05, 0.15],
+                                                [128, 9.8, 4.2, 1.825],
+                                                [254, 51, 18.25, 8.75]])
+    assert params.variables == {'Date': '9/2/1998', 'Time': '10:57:4',
+                                'pval': 1, 'gval': 2, 'rval': 3, 'bval': 4}
+    assert params.comments == ['BACKGROUND = 160', 'SPOT DIAMETER = 350']
+    np.testing.assert_array_equal(params.column('rval'), [0.05, 4.2, 18.25])
+
+
+def test_assignments_are_not_evaluated():
+    assert rd.parse_assignments("x = 2; y = __import__('os').getcwd(); z = -1.5e3;") == {'x': 2, 'z': -1500.0}
+
+
+def test_sidecar_reused_when_only_mtime_changes(ddf_copy, monkeypatch):
+    first = rd.read_data(ddf_copy)
+    sidecar = ddf_copy + '.npz'
+    stat = os.stat(ddf_copy)
+    os.utime(ddf_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def fail(text):
+        raise AssertionError("file was re-parsed")
+    monkeypatch.setattr(rd, 'parse_data_file', fail)
+    second = rd.read_data(ddf_copy)
+    np.testing.assert_array_equal(second.data, first.data)
+    assert second.variables.keys() == first.variables.keys()
+    assert second.comments == first.comments
+    with np.load(sidecar) as cached:
+        assert int(cached['mtime_ns']) == os.stat(ddf_copy).st_mtime_ns
+
+
+def test_sidecar_invalidated_when_content_changes(ddf_copy, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    assert rd.read_data(ddf_copy, cache_dir=cache_dir).data[0, 3] == 0.0937203
+
+    # Same size and a new mtime, so only the content hash can tell
+    with open(ddf_copy, 'rb') as f:
+        raw = f.read()
+    with open(ddf_copy, 'wb') as f:
+        f.write(raw.replace(b'0.0937203', b'0.0937204', 1))
+    stat = os.stat(ddf_copy)
+    os.utime(ddf_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert rd.read_data(ddf_copy, cache_dir=cache_dir).data[0, 3] == 0.0937204
+    assert os.listdir(cache_dir) == ['sample.ddf.npz']
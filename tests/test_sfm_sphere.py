@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from scarfe_demos.sfm_sphere import SphereTrajectory, sphere_dot_coords
+
+
+def make_trajectory(**kwargs):
+    coords = sphere_dot_coords(500, 400.0, np.random.default_rng(0))
+    return SphereTrajectory(coords, 0.3, 400.0, (4, 8), seed=0, **kwargs)
+
+
+@pytest.mark.parametrize('viewing_distance', [100.0, 400.0])
+def test_eye_inside_sphere_is_rejected(viewing_distance):
+    with pytest.raises(ValueError, match='viewing_distance'):
+        make_trajectory(viewing_distance=viewing_distance)
+
+
+def test_frames_are_order_independent():
+    forward, backward = make_trajectory(lifetime=10), make_trajectory(lifetime=10)
+    frames = [tuple(a.copy() for a in forward.frame(i)) for i in range(30)]
+    for i in reversed(range(30)):
+        for expected, actual in zip(frames[i], backward.frame(i)):
+            np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from scarfe_demos.sfm_sphere import sphere_trial_frames
+from scarfe_demos.trial_compiler import TrialCompileError, compile_trials
+
+
+def make_trials(**kwargs):
+    return [dict(num_dots=50, radius=100, n_frames=5, coherence=coherence, **kwargs)
+            for coherence in (0.5, 1.0)]
+
+
+def test_failures_are_collected_over_all_trials():
+    trials = make_trials() + [dict(num_dots=-1, radius=100, n_frames=5),
+                              dict(num_dots=50, radius=100, n_frames=5, events=[(0, 0.0, 0.1)])]
+    with pytest.raises(TrialCompileError) as info:
+        compile_trials(trials, sphere_trial_frames, processes=0)
+    failures = info.value.failures
+    assert [trial_i for trial_i, _, _ in failures] == [2, 3]
+    assert failures[0][1]['num_dots'] == -1
+    assert 'ifi is needed' in failures[1][2]
+    assert str(info.value).startswith("2 trial(s) failed to compile:")
+
+
+def test_fixed_seed_gives_identical_stimuli():
+    trials = make_trials(lifetime=3, events=[(0, 0.0, 0.05)])
+    first, second = (compile_trials(trials, sphere_trial_frames, ifi=1 / 60, processes=0, seed=1)
+                     for _ in range(2))
+    for a, b in zip(first, second):
+        assert 'rng' not in a.params
+        for block_a, block_b in zip(a.stimulus, b.stimulus):
+            np.testing.assert_array_equal(block_a, block_b)
+        np.testing.assert_array_equal(a.timeline.frames, b.timeline.frames)
+
+    # Each trial draws from its own stream
+    assert not np.array_equal(first[0].stimulus[0], first[1].stimulus[0])
+    other = compile_trials(trials, sphere_trial_frames, ifi=1 / 60, processes=0, seed=2)
+    assert not np.array_equal(first[0].stimulus[0], other[0].stimulus[0])
+
+
+def test_seed_needs_an_rng_argument():
+    def build(size):
+        return np.zeros(size)
+    with pytest.raises(ValueError, match='rng'):
+        compile_trials([dict(size=3)], build, processes=0, seed=1)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from noise_detect_discrim.weighted_mean import MEAN_TYPES, WeightedMean, weighted_mean, weighted_mean_of_arrays
+
+
+def direct(mean_type, values, weights, axis=None):
+    if mean_type == 'arithmetic':
+        return np.average(values, axis=axis, weights=weights)
+    if mean_type == 'geometric':
+        return np.exp(np.average(np.log(values), axis=axis, weights=weights))
+    return 1 / np.average(1 / values, axis=axis, weights=weights)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.lognormal(size=(40, 6, 5)), rng.uniform(0, 2, (40, 6, 5))
+
+
+@pytest.mark.parametrize('mean_type', MEAN_TYPES)
+def test_arrays_one_at_a_time(mean_type, data):
+    values, weights = data
+    np.testing.assert_allclose(weighted_mean_of_arrays(mean_type, iter(values), iter(weights)),
+                               direct(mean_type, values, weights, axis=0), rtol=1e-12)
+
+
+@pytest.mark.parametrize('mean_type', MEAN_TYPES)
+def test_stacked_chunks_and_merge(mean_type, data):
+    values, weights = data
+    first, second = WeightedMean(mean_type), WeightedMean(mean_type)
+    first.add(values[:7], weights[:7], stacked=True)
+    first.add(values[7:25], weights[7:25], stacked=True)
+    for v, w in zip(values[25:], weights[25:]):
+        second.add(v, w)
+    first.merge(second)
+    assert first.n_added == len(values)
+    np.testing.assert_allclose(first.mean, direct(mean_type, values, weights, axis=0), rtol=1e-12)
+
+
+@pytest.mark.parametrize('mean_type', MEAN_TYPES)
+@pytest.mark.parametrize('axis', [1, 'all'])
+def test_chunks_along_an_axis(mean_type, axis, data):
+    values, weights = data
+    acc = WeightedMean(mean_type, axis)
+    for start in range(0, 6, 4):
+        acc.add(values[:, start:start + 4], weights[:, start:start + 4])
+    expected = direct(mean_type, values, weights, axis=None if axis == 'all' else axis)
+    np.testing.assert_allclose(acc.mean, expected, rtol=1e-12)
+    np.testing.assert_allclose(weighted_mean(mean_type, values, weights, axis), expected, rtol=1e-12)
+
+
+def test_zero_weights_raise():
+    acc = WeightedMean('arithmetic')
+    acc.add([1.0, 2.0], [1.0, 0.0])
+    acc.add([3.0, 4.0], [1.0, 0.0])
+    with pytest.raises(ValueError, match='non-zero'):
+        acc.mean
+    with pytest.raises(ValueError, match='non-zero'):
+        weighted_mean('harmonic', [1, 2, 3], [0, 0, 0], axis='all')
+
+
+def test_invalid_input_raises():
+    with pytest.raises(ValueError):
+        WeightedMean('median')
+    with pytest.raises(ValueError):
+        weighted_mean('geometric', [1.0, -2.0], [1.0, 1.0])
+    with pytest.raises(ValueError):
+        weighted_mean('arithmetic', [1.0, 2.0], [1.0, -1.0])